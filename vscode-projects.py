@@ -10,12 +10,29 @@ VSCode Recent Projects Manager v1.0.0
 import os
 import sys
 import json
+import math
 import sqlite3
 import subprocess
 import unicodedata
 import tempfile
+import hashlib
+import struct
+import socket
 import shutil
+import signal
+import bisect
+import functools
+import heapq
+import itertools
+import multiprocessing
+import threading
+import queue
+import time
+from collections import deque, OrderedDict
+from array import array
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from urllib.parse import unquote, urlparse
+from urllib.request import pathname2url
 
 # 平台检测
 IS_WINDOWS = sys.platform == 'win32'
@@ -24,6 +41,20 @@ IS_WINDOWS = sys.platform == 'win32'
 HAS_UNIX_TERMINAL = False
 HAS_WINDOWS_TERMINAL = False
 
+# 共享内存（分片搜索使用）
+try:
+    from multiprocessing import shared_memory
+    HAS_SHARED_MEMORY = True
+except ImportError:
+    HAS_SHARED_MEMORY = False
+
+# 拼音搜索（可选依赖: pip install pypinyin）
+try:
+    from pypinyin import lazy_pinyin, Style
+    HAS_PINYIN = True
+except ImportError:
+    HAS_PINYIN = False
+
 if IS_WINDOWS:
     try:
         import msvcrt
@@ -34,7 +65,8 @@ else:
     try:
         import termios
         import tty
-        import fcntl
+        import select
+        import codecs
         HAS_UNIX_TERMINAL = True
     except ImportError:
         pass
@@ -99,17 +131,31 @@ def strip_ansi(s):
     return ANSI_ESCAPE.sub('', s)
 
 
+WIDTH_CACHE_SIZE = 4096  # 缓存前缀宽度表的字符串数
+
+
+@functools.lru_cache(maxsize=None)
 def char_width(c):
-    """获取字符显示宽度"""
+    """获取字符显示宽度（按码位缓存）"""
     if ord(c) < 32:
         return 0
     ea = unicodedata.east_asian_width(c)
     return 2 if ea in ('F', 'W', 'A') else 1
 
 
+@functools.lru_cache(maxsize=WIDTH_CACHE_SIZE)
+def prefix_widths(s):
+    """前缀宽度表：第 i 项为 s[:i] 的显示宽度"""
+    return list(itertools.accumulate(map(char_width, s), initial=0))
+
+
 def str_width(s):
     """计算字符串显示宽度（忽略 ANSI 转义序列）"""
-    return sum(char_width(c) for c in strip_ansi(s))
+    if '\x1b' in s:
+        s = strip_ansi(s)
+    if s.isascii() and s.isprintable():
+        return len(s)
+    return sum(map(char_width, s))
 
 
 def str_pad(s, width, align='left', fill=' '):
@@ -129,50 +175,29 @@ def str_pad(s, width, align='left', fill=' '):
 
 
 def str_cut(s, max_width, ellipsis='..'):
-    """截断字符串（保留 ANSI 转义序列）"""
-    # 如果没有 ANSI 代码，简单处理
-    if '\x1b' not in s:
-        if str_width(s) <= max_width:
+    """截断字符串（有 ANSI 转义序列时按纯文本截断）"""
+    plain = strip_ansi(s) if '\x1b' in s else s
+    ew = str_width(ellipsis)
+    if plain.isascii() and plain.isprintable():
+        if len(plain) <= max_width:
             return s
+        return plain[:max(0, max_width - ew)] + ellipsis
 
-        result = ''
-        width = 0
-        ew = str_width(ellipsis)
-
-        for c in s:
-            cw = char_width(c)
-            if width + cw + ew > max_width:
-                return result + ellipsis
-            result += c
-            width += cw
-        return result
-
-    # 有 ANSI 代码，需要特殊处理
-    plain = strip_ansi(s)
-    if str_width(plain) <= max_width:
+    # 在前缀宽度表上二分查找能放下的最长前缀
+    widths = prefix_widths(plain)
+    if widths[-1] <= max_width:
         return s
-
-    # 截断纯文本
-    result = ''
-    width = 0
-    ew = str_width(ellipsis)
-
-    for c in plain:
-        cw = char_width(c)
-        if width + cw + ew > max_width:
-            break
-        result += c
-        width += cw
-
-    return result + ellipsis
+    end = max(0, bisect.bisect_right(widths, max_width - ew) - 1)
+    return plain[:end] + ellipsis
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 系统检测和路径
 # ═══════════════════════════════════════════════════════════════════════════════
 
+@functools.lru_cache(maxsize=1)
 def detect_os():
-    """检测操作系统"""
+    """检测操作系统（结果在进程内复用）"""
     if sys.platform == 'win32':
         return 'windows'
     elif sys.platform == 'darwin':
@@ -184,6 +209,125 @@ def detect_os():
     return 'linux'
 
 
+# 已知编辑器: (来源名称, 用户数据目录名, 命令名)
+EDITORS = (
+    ('Code', 'Code', 'code'),
+    ('Insiders', 'Code - Insiders', 'code-insiders'),
+    ('VSCodium', 'VSCodium', 'codium'),
+    ('Cursor', 'Cursor', 'cursor'),
+)
+
+# 用户数据目录下 state.vscdb 的相对路径
+STATE_DB = 'User/globalStorage/state.vscdb'
+
+
+ENV_PROFILE_VERSION = 2
+
+
+class EnvProfile:
+    """跨运行缓存的环境信息（WSL 用户数据目录、编辑器命令路径）
+
+    缓存的值启动时只用 stat 校验，校验失败才重新查找（cmd.exe、遍历用户目录、shutil.which）；
+    操作系统或 PATH 变化时整体失效。找不到的结果不缓存。
+    """
+
+    def __init__(self):
+        self.path = os.path.join(get_cache_dir(), 'env.json')
+        path_env = os.environ.get('PATH', '').encode('utf-8', 'surrogateescape')
+        self.key = [ENV_PROFILE_VERSION, detect_os(), hashlib.sha1(path_env).hexdigest()[:16]]
+        data = read_json_file(self.path)
+        self.values = {}
+        if isinstance(data, dict) and data.get('key') == self.key:
+            self.values = data.get('values') or {}
+
+    def resolve(self, name, find, check):
+        """返回 name 对应的值：缓存的值通过 check 校验则直接使用，否则调用 find 查找并保存"""
+        value = self.values.get(name)
+        if value and check(value):
+            return value
+        value = find()
+        if value:
+            self.values[name] = value
+        elif self.values.pop(name, None) is None:
+            return value
+        write_json_file(self.path, {'key': self.key, 'values': self.values})
+        return value
+
+
+@functools.lru_cache(maxsize=1)
+def env_profile():
+    """获取环境信息缓存（进程内只读取一次）"""
+    return EnvProfile()
+
+
+def find_wsl_config_base():
+    """查找 WSL 下 Windows 用户的 AppData/Roaming 目录（较慢：需要启动 cmd.exe）"""
+    try:
+        result = subprocess.run(['cmd.exe', '/c', 'echo %USERNAME%'],
+                                capture_output=True, text=True, timeout=5)
+        username = result.stdout.strip()
+        roaming = f'/mnt/c/Users/{username}/AppData/Roaming'
+        if username and os.path.isdir(roaming):
+            return roaming
+    except:
+        pass
+    base = '/mnt/c/Users'
+    try:
+        names = os.listdir(base)
+    except OSError:
+        return None
+    for name in names:
+        roaming = os.path.join(base, name, 'AppData/Roaming')
+        for _, dirname, _ in EDITORS:
+            if os.path.exists(os.path.join(roaming, dirname, STATE_DB)):
+                return roaming
+    return None
+
+
+def get_config_base():
+    """获取编辑器用户数据目录所在的基础目录"""
+    os_type = detect_os()
+
+    if os_type == 'windows':
+        return os.environ.get('APPDATA', os.path.expanduser('~/AppData/Roaming'))
+    elif os_type == 'macos':
+        return os.path.expanduser('~/Library/Application Support')
+    elif os_type == 'wsl':
+        return env_profile().resolve('config_base', find_wsl_config_base, os.path.isdir)
+    else:
+        return os.path.expanduser('~/.config')
+
+
+def source_of(db_path):
+    """根据数据库路径推断所属编辑器"""
+    parts = re.split(r'[\\/]', db_path)
+    for name, dirname, _ in EDITORS:
+        if dirname in parts:
+            return name
+    return EDITORS[0][0]
+
+
+def get_db_paths(custom_path=None):
+    """获取所有已安装编辑器的 state.vscdb 路径，返回 [(来源名称, 路径)]
+
+    指定 --db 时只使用该数据库；都不存在时返回 VSCode 的默认路径，让后续报错。
+    """
+    if custom_path:
+        path = get_db_path(custom_path)
+        return [(source_of(path), path)]
+
+    base = get_config_base()
+    if not base:
+        return [(EDITORS[0][0], None)]
+
+    found = []
+    for name, dirname, _ in EDITORS:
+        path = os.path.join(base, dirname, STATE_DB)
+        if os.path.exists(path):
+            found.append((name, path))
+    return found or [(EDITORS[0][0], os.path.join(base, EDITORS[0][1], STATE_DB))]
+
+
 def get_db_path(custom_path=None):
     """获取 VSCode state.vscdb 路径
 
@@ -201,38 +345,19 @@ def get_db_path(custom_path=None):
             return expanded
         return custom_path  # 返回原路径，让后续报错
 
-    os_type = detect_os()
-
-    if os_type == 'windows':
-        base = os.environ.get('APPDATA', os.path.expanduser('~/AppData/Roaming'))
-    elif os_type == 'macos':
-        base = os.path.expanduser('~/Library/Application Support')
-    elif os_type == 'wsl':
-        try:
-            result = subprocess.run(['cmd.exe', '/c', 'echo %USERNAME%'],
-                                    capture_output=True, text=True, timeout=5)
-            username = result.stdout.strip()
-            base = f'/mnt/c/Users/{username}/AppData/Roaming'
-        except:
-            base = '/mnt/c/Users'
-            for name in os.listdir(base):
-                test = os.path.join(base, name, 'AppData/Roaming/Code/User/globalStorage/state.vscdb')
-                if os.path.exists(test):
-                    return test
-            return None
-    else:
-        base = os.path.expanduser('~/.config')
-
-    return os.path.join(base, 'Code/User/globalStorage/state.vscdb')
+    return get_db_paths()[0][1]
 
 
-def get_vscode_cmd(custom_path=None):
+def get_vscode_cmd(custom_path=None, source=None):
     """获取 VSCode 命令
 
     优先级:
     1. 用户指定的路径 (--code 参数)
     2. PATH 环境变量中的命令
     3. Windows 常见安装位置
+
+    source 为来源名称时优先查找该编辑器自己的命令，找不到时使用通用的查找结果；
+    2、3 的结果跨运行缓存（只缓存各编辑器自己的命令，之后安装的命令下次启动即可找到）。
     """
     # 1. 用户指定的路径
     if custom_path:
@@ -243,8 +368,26 @@ def get_vscode_cmd(custom_path=None):
         if found:
             return found
 
+    if source:
+        found = env_profile().resolve(f'code:{source}', lambda: find_vscode_cmd(source),
+                                      os.path.isfile)
+        if found:
+            return found
+    return env_profile().resolve('code:', find_vscode_cmd, os.path.isfile)
+
+
+def find_vscode_cmd(source=None):
+    """在 PATH 和 Windows 常见安装位置中查找编辑器命令
+
+    source 为来源名称时只查找该编辑器自己的命令，否则按 EDITORS 的顺序查找任意一个。
+    """
+    preferred = next((cmd for name, _, cmd in EDITORS if name == source), None)
+    if source and not preferred:
+        return None
+    commands = [preferred] if preferred else [cmd for _, _, cmd in EDITORS]
+
     # 2. PATH 中的命令
-    for cmd in ['code', 'code-insiders', 'codium']:
+    for cmd in commands:
         found = shutil.which(cmd)
         if found:
             return found
@@ -261,6 +404,8 @@ def get_vscode_cmd(custom_path=None):
                 os.path.join(local_app, 'Programs', 'Microsoft VS Code', 'Code.exe'),
                 os.path.join(local_app, 'Programs', 'Microsoft VS Code Insiders', 'bin', 'code-insiders.cmd'),
                 os.path.join(local_app, 'Programs', 'Microsoft VS Code Insiders', 'Code - Insiders.exe'),
+                os.path.join(local_app, 'Programs', 'VSCodium', 'bin', 'codium.cmd'),
+                os.path.join(local_app, 'Programs', 'cursor', 'resources', 'app', 'bin', 'cursor.cmd'),
             ])
 
         # 系统安装
@@ -273,7 +418,10 @@ def get_vscode_cmd(custom_path=None):
                 os.path.join(pf, 'Microsoft VS Code Insiders', 'bin', 'code-insiders.cmd'),
             ])
 
-        # 检查每个路径
+        # 检查每个路径（指定来源时只接受该编辑器自己的命令）
+        if preferred:
+            possible_paths = [p for p in possible_paths
+                              if os.path.splitext(os.path.basename(p))[0].lower() == preferred]
         for path in possible_paths:
             if os.path.exists(path):
                 return path
@@ -304,230 +452,2031 @@ def copy_to_clipboard(text):
         return False
 
 
-def open_in_file_manager(path):
-    """在文件管理器中打开路径"""
+def file_manager_command(path):
+    """在文件管理器中打开路径的命令: (参数, 是否 shell, 是否检查退出码)"""
     os_type = detect_os()
-    try:
-        if os_type == 'macos':
-            subprocess.Popen(['open', path])
-        elif os_type == 'wsl':
-            # WSL 路径转 Windows 路径
-            if path.startswith('/mnt/'):
-                # /mnt/c/xxx -> C:\xxx
-                win_path = path[5].upper() + ':' + path[6:].replace('/', '\\')
-                subprocess.Popen(['explorer.exe', win_path])
-            else:
-                # 尝试使用 wslpath
-                result = subprocess.run(['wslpath', '-w', path], capture_output=True, text=True)
-                if result.returncode == 0:
-                    subprocess.Popen(['explorer.exe', result.stdout.strip()])
-                else:
-                    subprocess.Popen(['explorer.exe', path])
-        elif os_type == 'windows':
-            # Windows 路径需要使用反斜杠，并确保路径存在
-            win_path = path.replace('/', '\\')
-            if os.path.exists(win_path):
-                subprocess.Popen(['explorer', win_path], shell=True)
-            else:
-                # 如果路径不存在，尝试打开父目录
-                parent = os.path.dirname(win_path)
-                if os.path.exists(parent):
-                    subprocess.Popen(['explorer', parent], shell=True)
-                else:
-                    subprocess.Popen(['explorer', win_path], shell=True)
-        else:  # linux
-            subprocess.Popen(['xdg-open', path])
-        return True
-    except:
-        return False
+    if os_type == 'macos':
+        return ['open', path], False, True
+    elif os_type == 'wsl':
+        # WSL 路径转 Windows 路径；explorer.exe 成功时也常返回 1，不检查退出码
+        if path.startswith('/mnt/'):
+            # /mnt/c/xxx -> C:\xxx
+            win_path = path[5].upper() + ':' + path[6:].replace('/', '\\')
+            return ['explorer.exe', win_path], False, False
+        # 尝试使用 wslpath
+        try:
+            result = subprocess.run(['wslpath', '-w', path], capture_output=True, text=True,
+                                    timeout=LAUNCH_TIMEOUT)
+            if result.returncode == 0:
+                return ['explorer.exe', result.stdout.strip()], False, False
+        except (OSError, subprocess.SubprocessError):
+            pass
+        return ['explorer.exe', path], False, False
+    elif os_type == 'windows':
+        # Windows 路径需要使用反斜杠，并确保路径存在
+        win_path = path.replace('/', '\\')
+        if not os.path.exists(win_path):
+            # 如果路径不存在，尝试打开父目录
+            parent = os.path.dirname(win_path)
+            if os.path.exists(parent):
+                win_path = parent
+        return ['explorer', win_path], True, False
+    else:  # linux
+        return ['xdg-open', path], False, True
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 数据加载
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def load_projects(db_path):
-    """从数据库加载项目"""
-    if not db_path or not os.path.exists(db_path):
-        return []
+HISTORY_KEY = 'history.recentlyOpenedPathsList'
 
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM ItemTable WHERE key='history.recentlyOpenedPathsList'")
-        row = cursor.fetchone()
-        conn.close()
+# 解析缓存格式版本，记录结构变化时递增
+CACHE_VERSION = 3
 
-        if not row:
-            return []
+# 项目记录中由历史条目解析得到的字段（写入缓存；exists 等运行时状态不缓存）
+RECORD_FIELDS = ('uri', 'name', 'path', 'full_path', 'display_path', 'type', 'tag',
+                 'check_path', 'label', 'kind', 'pinyin', 'initials')
 
-        data = json.loads(row[0])
-        projects = []
+# vscode-remote 路径中按文件处理的常见扩展名
+REMOTE_FILE_EXTS = ('py', 'js', 'ts', 'jsx', 'tsx', 'vue', 'json', 'sh', 'md',
+                    'txt', 'html', 'css', 'scss', 'yaml', 'yml', 'toml', 'xml')
 
-        for entry in data.get('entries', []):
-            uri = entry.get('folderUri') or entry.get('fileUri') or \
-                  (entry.get('workspace', {}) or {}).get('configPath', '')
 
-            if not uri:
-                continue
+def get_cache_dir():
+    """获取缓存目录"""
+    if IS_WINDOWS:
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~/AppData/Local')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'vscode-projects')
 
-            label = entry.get('label', '')
 
-            # 类型判断
-            if entry.get('folderUri'):
-                ptype = 'folder'
-            elif entry.get('fileUri'):
-                ptype = 'file'
-            elif entry.get('workspace'):
-                ptype = 'workspace'
-            else:
-                # 对于 vscode-remote，如果既没有 folderUri 也没有 fileUri
-                # 根据路径判断（通常带扩展名的是文件）
-                ptype = 'folder'
-
-            # 解析路径
-            remote_tag = ''
-            if uri.startswith('file://'):
-                parsed = urlparse(uri)
-                path = unquote(parsed.path)
-                if len(path) > 2 and path[0] == '/' and path[2] == ':':
-                    path = path[1:]
-            elif uri.startswith('vscode-remote://'):
-                parsed = urlparse(uri)
-                path = unquote(parsed.path)
-                netloc = unquote(parsed.netloc)
-
-                # 解析 wsl+Ubuntu, wsl+Debian, ssh-remote+hostname 等格式
-                if netloc.lower().startswith('wsl+'):
-                    # wsl+ubuntu -> WSL: Ubuntu (首字母大写)
-                    distro = netloc[4:]
-                    if distro:
-                        distro = distro[0].upper() + distro[1:] if len(distro) > 0 else distro
-                    remote_tag = f'WSL: {distro}' if distro else 'WSL'
-                elif netloc.lower() == 'wsl':
-                    remote_tag = 'WSL'
-                elif netloc.lower().startswith('ssh-remote+'):
-                    host = netloc[11:]
-                    remote_tag = f'SSH: {host}' if host else 'SSH'
-                elif 'ssh' in netloc.lower():
-                    remote_tag = 'SSH'
-                elif 'dev-container' in netloc.lower():
-                    remote_tag = 'Container'
-                else:
-                    remote_tag = 'Remote'
-
-                # 对于 vscode-remote URI，根据文件扩展名判断类型
-                if ptype == 'folder':
-                    basename = os.path.basename(path)
-                    if '.' in basename and not basename.startswith('.'):
-                        ext = basename.rsplit('.', 1)[-1].lower()
-                        # 常见代码文件扩展名
-                        if ext in ('py', 'js', 'ts', 'jsx', 'tsx', 'vue', 'json', 'sh', 'md',
-                                   'txt', 'html', 'css', 'scss', 'yaml', 'yml', 'toml', 'xml'):
-                            ptype = 'file'
-            else:
-                path = uri
+def cache_file(kind, db_path, ext='.json'):
+    """获取与数据库对应的缓存文件路径"""
+    key = hashlib.sha1(os.path.abspath(db_path).encode('utf-8', 'surrogateescape')).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), f'{kind}-{key}{ext}')
+
+
+def read_json_file(path):
+    """读取 JSON 文件，失败返回 None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
-            # 从 label 提取标签 (优先使用 VSCode 提供的标签)
-            if label and '[' in label and ']' in label:
-                ts = label.rfind('[')
-                te = label.rfind(']')
-                if ts < te:
-                    remote_tag = label[ts+1:te]
 
-            name = os.path.basename(path) or path
-            dir_path = os.path.dirname(path) or '/'
+def write_json_file(path, data):
+    """原子写入 JSON 文件（先写临时文件再替换）"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        return False
 
-            # 计算显示路径（根据运行环境调整）
-            # Windows 环境：WSL 挂载路径 -> Windows 路径
-            # WSL 环境：Windows 路径 -> WSL 挂载路径
-            os_type = detect_os()
-            display_path = ''  # 用于显示的转换路径
 
+def db_stamp(db_path):
+    """数据库及 -wal 文件的 (大小, 修改时间) 标识"""
+    stamp = []
+    for path in (db_path, db_path + '-wal'):
+        try:
+            st = os.stat(path)
+            stamp.append([st.st_size, st.st_mtime_ns])
+        except OSError:
+            stamp.append(None)
+    return stamp
+
+
+def entry_uri(entry):
+    """获取历史记录条目的 URI"""
+    return entry.get('folderUri') or entry.get('fileUri') or \
+           (entry.get('workspace', {}) or {}).get('configPath', '')
+
+
+def entry_kind(entry):
+    """历史记录条目的类型键"""
+    if entry.get('folderUri'):
+        return 'folderUri'
+    if entry.get('fileUri'):
+        return 'fileUri'
+    if entry.get('workspace'):
+        return 'workspace'
+    return ''
+
+
+def pinyin_of(text):
+    """文本的全拼和拼音首字母，不含汉字或未安装 pypinyin 时为空"""
+    if not HAS_PINYIN or not any('\u3400' <= c <= '\u9fff' for c in text):
+        return '', ''
+    full = ''.join(lazy_pinyin(text))
+    initials = ''.join(lazy_pinyin(text, style=Style.FIRST_LETTER))
+    return full, initials
+
+
+def parse_entry(entry, os_type):
+    """解析单条历史记录为项目记录（不含存在性）"""
+    uri = entry_uri(entry)
+    if not uri:
+        return None
+
+    label = entry.get('label', '')
+
+    # 类型判断
+    if entry.get('folderUri'):
+        ptype = 'folder'
+    elif entry.get('fileUri'):
+        ptype = 'file'
+    elif entry.get('workspace'):
+        ptype = 'workspace'
+    else:
+        # 对于 vscode-remote，如果既没有 folderUri 也没有 fileUri
+        # 根据路径判断（通常带扩展名的是文件）
+        ptype = 'folder'
+
+    # 解析路径
+    remote_tag = ''
+    if uri.startswith('file://'):
+        parsed = urlparse(uri)
+        path = unquote(parsed.path)
+        if len(path) > 2 and path[0] == '/' and path[2] == ':':
+            path = path[1:]
+    elif uri.startswith('vscode-remote://'):
+        parsed = urlparse(uri)
+        path = unquote(parsed.path)
+        netloc = unquote(parsed.netloc)
+
+        # 解析 wsl+Ubuntu, wsl+Debian, ssh-remote+hostname 等格式
+        if netloc.lower().startswith('wsl+'):
+            # wsl+ubuntu -> WSL: Ubuntu (首字母大写)
+            distro = netloc[4:]
+            if distro:
+                distro = distro[0].upper() + distro[1:] if len(distro) > 0 else distro
+            remote_tag = f'WSL: {distro}' if distro else 'WSL'
+        elif netloc.lower() == 'wsl':
+            remote_tag = 'WSL'
+        elif netloc.lower().startswith('ssh-remote+'):
+            host = netloc[11:]
+            remote_tag = f'SSH: {host}' if host else 'SSH'
+        elif 'ssh' in netloc.lower():
+            remote_tag = 'SSH'
+        elif 'dev-container' in netloc.lower():
+            remote_tag = 'Container'
+        else:
+            remote_tag = 'Remote'
+
+        # 对于 vscode-remote URI，根据文件扩展名判断类型
+        if ptype == 'folder':
+            basename = os.path.basename(path)
+            if '.' in basename and not basename.startswith('.'):
+                ext = basename.rsplit('.', 1)[-1].lower()
+                # 常见代码文件扩展名
+                if ext in REMOTE_FILE_EXTS:
+                    ptype = 'file'
+    else:
+        path = uri
+
+    # 从 label 提取标签 (优先使用 VSCode 提供的标签)
+    if label and '[' in label and ']' in label:
+        ts = label.rfind('[')
+        te = label.rfind(']')
+        if ts < te:
+            remote_tag = label[ts+1:te]
+
+    name = os.path.basename(path) or path
+    dir_path = os.path.dirname(path) or '/'
+
+    # 计算显示路径（根据运行环境调整）
+    # Windows 环境：WSL 挂载路径 -> Windows 路径
+    # WSL 环境：Windows 路径 -> WSL 挂载路径
+    display_path = ''  # 用于显示的转换路径
+
+    if os_type == 'wsl':
+        # WSL 环境：Windows 路径转换为挂载路径
+        if len(path) > 2 and path[1] == ':':
+            # D:/xxx -> /mnt/d/xxx
+            drive = path[0].lower()
+            rest = path[2:].replace('\\', '/')
+            display_path = f'/mnt/{drive}{rest}'
+    else:
+        # Windows 环境：WSL 挂载路径转换为 Windows 路径
+        if path.startswith('/mnt/') and len(path) > 6:
+            if path[6] == '/' and path[5].isalpha():
+                # /mnt/d/xxx -> D:/xxx
+                drive = path[5].upper()
+                rest = path[7:]
+                if ':' not in rest:
+                    display_path = f'{drive}:/{rest}'
+
+    # 存在性检测使用的本地路径（空表示无法检测，视为存在）
+    check_path = ''
+
+    if uri.startswith('file://'):
+        if os_type == 'wsl' and display_path:
+            # WSL 环境，用转换后的挂载路径检测
+            check_path = display_path
+        else:
+            check_path = path
+    elif uri.startswith('vscode-remote://'):
+        # 远程路径检测
+        if display_path:
+            # 有转换路径，用转换路径检测
             if os_type == 'wsl':
-                # WSL 环境：Windows 路径转换为挂载路径
-                if len(path) > 2 and path[1] == ':':
-                    # D:/xxx -> /mnt/d/xxx
-                    drive = path[0].lower()
-                    rest = path[2:].replace('\\', '/')
-                    display_path = f'/mnt/{drive}{rest}'
+                check_path = path  # WSL 项目用原始路径
             else:
-                # Windows 环境：WSL 挂载路径转换为 Windows 路径
-                if path.startswith('/mnt/') and len(path) > 6:
-                    if path[6] == '/' and path[5].isalpha():
-                        # /mnt/d/xxx -> D:/xxx
-                        drive = path[5].upper()
-                        rest = path[7:]
-                        if ':' not in rest:
-                            display_path = f'{drive}:/{rest}'
-
-            # 检测路径是否存在
-            exists = True
-
-            if uri.startswith('file://'):
-                if os_type == 'wsl' and display_path:
-                    # WSL 环境，用转换后的挂载路径检测
-                    exists = os.path.exists(display_path)
-                else:
-                    exists = os.path.exists(path)
-            elif uri.startswith('vscode-remote://'):
-                # 远程路径检测
-                if display_path:
-                    # 有转换路径，用转换路径检测
-                    if os_type == 'wsl':
-                        exists = os.path.exists(path)  # WSL 项目用原始路径
-                    else:
-                        win_path = display_path.replace('/', '\\')
-                        exists = os.path.exists(win_path)
-                else:
-                    # SSH/Container 等远程路径，默认存在
-                    exists = True
-
-            projects.append({
-                'uri': uri,
-                'name': name,
-                'path': dir_path,
-                'full_path': path,
-                'display_path': display_path,  # 转换后的显示路径
-                'type': ptype,
-                'tag': remote_tag,
-                'exists': exists  # 路径是否存在
-            })
+                check_path = display_path.replace('/', '\\')
+        # SSH/Container 等远程路径，默认存在
+
+    pinyin, initials = pinyin_of(name)
+
+    return {
+        'uri': uri,
+        'name': name,
+        'path': dir_path,
+        'full_path': path,
+        'display_path': display_path,  # 转换后的显示路径
+        'type': ptype,
+        'tag': remote_tag,
+        'check_path': check_path,  # 存在性检测路径
+        'label': label,
+        'kind': entry_kind(entry),
+        'pinyin': pinyin,      # 名称的全拼（用于搜索）
+        'initials': initials,  # 名称的拼音首字母
+    }
+
+
+def parse_history(blob, os_type, previous=None):
+    """解析 history.recentlyOpenedPathsList 的 JSON 内容
+
+    previous 为 URI -> 旧记录 的映射；URI、标签和类型都未变的条目直接复用旧记录。
+    """
+    data = json.loads(blob)
+    previous = previous or {}
+    projects = []
+    for entry in data.get('entries', []):
+        old = previous.get(entry_uri(entry))
+        if old is not None and old['label'] == entry.get('label', '') \
+                and old['kind'] == entry_kind(entry):
+            projects.append(old)
+            continue
+        p = parse_entry(entry, os_type)
+        if p:
+            projects.append(p)
+    return projects
+
+
+def reuse_records(projects, previous):
+    """将内容未变的记录替换为旧记录对象（保留存在性等运行时状态）"""
+    if not previous:
+        return projects
+    result = []
+    for p in projects:
+        old = previous.get(p['uri'])
+        if old is not None and all(old[k] == p[k] for k in RECORD_FIELDS):
+            p = old
+        result.append(p)
+    return result
+
+
+class SnapshotReader:
+    """state.vscdb 只读读取器
+
+    通过只读 URI 打开数据库并在会话内复用同一连接，读取不会与 VSCode 的写入争用锁；
+    PRAGMA data_version 用于判断自上次检查后是否有其他连接提交过修改。
+    """
 
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = None
+        self.version = None  # 上次检查时的 data_version
+
+    def _connect(self):
+        if self.conn is None:
+            uri = 'file:' + pathname2url(os.path.abspath(self.db_path)) + '?mode=ro'
+            try:
+                self.conn = sqlite3.connect(uri, uri=True, isolation_level=None,
+                                            check_same_thread=False)
+            except sqlite3.Error:
+                # 只读打开失败（如缺少 -shm 且目录不可写）时退回普通连接，仍只做读取
+                self.conn = sqlite3.connect(self.db_path, isolation_level=None,
+                                            check_same_thread=False)
+        return self.conn
+
+    def poll(self):
+        """数据库自上次检查后是否有变化（首次检查返回 True）"""
+        try:
+            version = self._connect().execute('PRAGMA data_version').fetchone()[0]
+        except sqlite3.Error:
+            self.close()
+            return True
+        changed = version != self.version
+        self.version = version
+        return changed
+
+    def read(self):
+        """读取最近打开列表的原始 JSON，不存在时返回 None"""
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM ItemTable WHERE key=?", (HISTORY_KEY,)).fetchone()
+        except sqlite3.Error:
+            # 连接失效（如数据库被替换）时重连一次
+            self.close()
+            row = self._connect().execute(
+                "SELECT value FROM ItemTable WHERE key=?", (HISTORY_KEY,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except sqlite3.Error:
+                pass
+            self.conn = None
+
+
+def load_records(db_path, reader=None, previous=None):
+    """加载解析后的项目记录（不含存在性），优先使用磁盘缓存
+
+    缓存以数据库和 -wal 文件的大小/修改时间为键；
+    文件有变化时再比较原始 JSON 的哈希，内容未变则跳过解析。
+    previous 为上次加载的记录列表，未变化的条目复用原记录对象，只解析新增或修改的条目。
+    返回 (内容哈希, 项目列表)。
+    """
+    previous = {p['uri']: p for p in previous} if previous else None
+    os_type = detect_os()
+    path = cache_file('projects', db_path)
+    stamp = db_stamp(db_path)
+
+    cached = read_json_file(path)
+    if not isinstance(cached, dict) or cached.get('version') != CACHE_VERSION \
+            or cached.get('os') != os_type or cached.get('pinyin') != HAS_PINYIN:
+        cached = None
+
+    # 文件未变化：直接使用缓存
+    if cached and cached.get('stamp') == stamp:
+        return cached['hash'], reuse_records(cached['projects'], previous)
+
+    if reader:
+        blob = reader.read()
+    else:
+        reader = SnapshotReader(db_path)
+        try:
+            blob = reader.read()
+        finally:
+            reader.close()
+    if blob is None:
+        return None, []
+
+    digest = blob_digest(blob)
+
+    # 文件有变化但列表内容未变：复用缓存的解析结果
+    if cached and cached.get('hash') == digest:
+        projects = reuse_records(cached['projects'], previous)
+    else:
+        projects = parse_history(blob, os_type, previous)
+
+    write_json_file(path, {
+        'version': CACHE_VERSION,
+        'os': os_type,
+        'pinyin': HAS_PINYIN,
+        'stamp': stamp,
+        'hash': digest,
+        'projects': [{k: p[k] for k in RECORD_FIELDS} for p in projects],
+    })
+    return digest, projects
+
+
+# 存在性检测：并发线程数、单个挂载点并发上限、单个挂载点超时（秒）
+PROBE_WORKERS = 8
+PROBE_PER_MOUNT = 2
+PROBE_TIMEOUT = 2.0
+PROBE_SPARE_WORKERS = 8  # 检测卡住时最多额外启动的线程数
+
+# 存在性缓存有效期（秒），按路径前缀匹配，最长前缀优先；可用 --ttl 覆盖
+EXISTS_TTL = {
+    '/mnt/': 300,   # WSL 下的 Windows 盘 (drvfs)
+    '//': 300,      # UNC 网络路径
+    '\\\\': 300,   # UNC 网络路径 (反斜杠)
+    '': 10,         # 本地文件系统
+}
+
+
+@functools.lru_cache(maxsize=1)
+def mount_points():
+    """读取系统挂载点列表（按长度降序）"""
+    points = ['/']
+    try:
+        with open('/proc/mounts', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) > 1:
+                    # 挂载点中的空格等字符以八进制转义
+                    points.append(re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), parts[1]))
+    except OSError:
+        pass
+    return sorted(set(points), key=len, reverse=True)
+
+
+def mount_of(path):
+    """获取路径所在的挂载点"""
+    # Windows 盘符: D:\xxx -> D:
+    if len(path) > 1 and path[1] == ':':
+        return path[:2].upper()
+    # UNC 路径: \\server\share\xxx -> //server/share
+    if path.startswith(('\\\\', '//')):
+        parts = re.split(r'[\\/]+', path.lstrip('\\/'))
+        return '//' + '/'.join(parts[:2])
+    for m in mount_points():
+        if path == m or path.startswith(m.rstrip('/') + '/'):
+            if m == '/' and path.startswith('/mnt/') and len(path) > 5:
+                # 未读到挂载表时按 /mnt/<drive> 区分
+                return '/'.join(path.split('/', 3)[:3])
+            return m
+    return '/'
+
+
+class ExistenceProber:
+    """后台并发检测路径是否存在
+
+    每个挂载点限制并发数；挂载点上的检测超过 PROBE_TIMEOUT 未返回时，
+    该挂载点剩余的路径全部记为超时（None），避免失效的网络/drvfs 挂载卡住启动。
+    卡住的线程由新线程顶替（最多 PROBE_SPARE_WORKERS 个），其他挂载点的检测不受影响。
+    检测线程为守护线程，卡住的 stat 不会阻止程序退出。
+    """
+
+    def __init__(self, workers=PROBE_WORKERS, per_mount=PROBE_PER_MOUNT, timeout=PROBE_TIMEOUT):
+        self.workers = workers
+        self.per_mount = per_mount
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.tasks = queue.Queue()      # 已派发的 (挂载点, 路径)
+        self.results = queue.Queue()    # 检测结果 (路径, True/False/None)
+        self.waiting = {}               # 挂载点 -> 未派发的路径
+        self.inflight = {}              # 挂载点 -> {路径: 开始时间，排队中为 None}
+        self.dead = set()               # 已超时的挂载点
+        self.pending = set()            # 尚未出结果的路径
+        self.stuck = set()              # 超时仍未返回的 (挂载点, 路径)，各占一个线程
+        self.threads = []
+
+    def submit(self, paths):
+        """提交待检测路径"""
+        with self.lock:
+            for path in paths:
+                if not path or path in self.pending:
+                    continue
+                mount = mount_of(path)
+                if mount in self.dead:
+                    self.results.put((path, None))
+                    continue
+                self.pending.add(path)
+                self.waiting.setdefault(mount, deque()).append(path)
+                self._dispatch(mount)
+            self._spawn(min(self.workers, len(self.pending)))
+
+    def _spawn(self, wanted):
+        """保证可用（未卡住）的线程数达到 wanted，总数不超过上限（需持有锁）"""
+        limit = self.workers + PROBE_SPARE_WORKERS
+        while len(self.threads) - len(self.stuck) < wanted and len(self.threads) < limit:
+            t = threading.Thread(target=self._worker, daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def _retire(self, mount):
+        """挂载点上卡住的检测全部返回后允许重新检测（需持有锁）"""
+        if not self.inflight.get(mount):
+            self.dead.discard(mount)
+
+    def _dispatch(self, mount):
+        """在并发上限内派发挂载点上的路径（需持有锁）"""
+        waiting = self.waiting.get(mount)
+        inflight = self.inflight.setdefault(mount, {})
+        while waiting and len(inflight) < self.per_mount:
+            path = waiting.popleft()
+            inflight[path] = None
+            self.tasks.put((mount, path))
+
+    def _worker(self):
+        me = threading.current_thread()
+        while True:
+            mount, path = self.tasks.get()
+            with self.lock:
+                inflight = self.inflight.get(mount, {})
+                if mount in self.dead:
+                    # 排队期间挂载点已超时（结果已记为未知），不再检测
+                    inflight.pop(path, None)
+                    self._retire(mount)
+                    continue
+                inflight[path] = time.monotonic()  # 超时从真正开始检测时计算
+            try:
+                state = os.path.exists(path)
+            except Exception:
+                state = False
+            with self.lock:
+                inflight = self.inflight.get(mount, {})
+                inflight.pop(path, None)
+                if (mount, path) in self.stuck:
+                    # 已有线程顶替：线程多于需要时退出
+                    self.stuck.discard((mount, path))
+                    if len(self.threads) - len(self.stuck) > self.workers:
+                        self.threads.remove(me)
+                        self._retire(mount)
+                        return
+                if mount in self.dead:
+                    # 超时后才返回的结果丢弃
+                    self._retire(mount)
+                    continue
+                self.pending.discard(path)
+                self.results.put((path, state))
+                self._dispatch(mount)
+
+    def busy(self):
+        """是否还有未完成的检测"""
+        return bool(self.pending) or not self.results.empty()
+
+    def poll(self):
+        """处理超时并取出已完成的结果列表"""
+        now = time.monotonic()
+        with self.lock:
+            for mount, inflight in self.inflight.items():
+                started = [t for t in inflight.values() if t is not None]
+                if mount in self.dead or not started:
+                    continue
+                if now - min(started) < self.timeout:
+                    continue
+                # 挂载点超时：剩余路径全部记为未知，卡住的线程由新线程顶替
+                self.dead.add(mount)
+                self.stuck.update((mount, path) for path, t in inflight.items() if t is not None)
+                stalled = list(inflight) + list(self.waiting.pop(mount, ()))
+                for path in stalled:
+                    self.pending.discard(path)
+                    self.results.put((path, None))
+            if self.stuck:
+                self._spawn(min(self.workers, len(self.pending)))
+
+        done = []
+        while True:
+            try:
+                done.append(self.results.get_nowait())
+            except queue.Empty:
+                return done
+
+    def wait(self):
+        """阻塞直到所有检测完成或超时，返回全部结果"""
+        done = self.poll()
+        while self.busy():
+            time.sleep(0.01)
+            done.extend(self.poll())
+        return done
+
+
+class ExistsCache:
+    """跨运行的存在性检测结果缓存
+
+    同时缓存“存在”、“不存在”和“超时”（None）结果，有效期按路径前缀取自 EXISTS_TTL。
+    """
+
+    def __init__(self, path=None, ttl=None):
+        self.path = path or os.path.join(get_cache_dir(), 'exists.json')
+        # 按前缀长度降序，最长前缀优先匹配
+        self.ttl = sorted((ttl or EXISTS_TTL).items(), key=lambda kv: len(kv[0]), reverse=True)
+        data = read_json_file(self.path)
+        self.entries = data if isinstance(data, dict) else {}  # 路径 -> [状态, 检测时间]
+        self.dirty = False
+
+    def ttl_of(self, path):
+        """获取路径对应的有效期（秒）"""
+        for prefix, ttl in self.ttl:
+            if path.startswith(prefix):
+                return ttl
+        return 0
+
+    def lookup(self, path):
+        """查询未过期的结果，返回 (是否命中, 状态)"""
+        item = self.entries.get(path)
+        if not item:
+            return False, None
+        state, checked = item
+        if time.time() - checked > self.ttl_of(path):
+            return False, None
+        return True, state
+
+    def store(self, path, state):
+        self.entries[path] = [state, time.time()]
+        self.dirty = True
+
+    def save(self):
+        """清理过期条目并写回磁盘"""
+        if not self.dirty:
+            return
+        now = time.time()
+        self.entries = {
+            path: item for path, item in self.entries.items()
+            if now - item[1] <= self.ttl_of(path)
+        }
+        write_json_file(self.path, self.entries)
+        self.dirty = False
+
+
+def probe_projects(projects, prober, cache=None):
+    """提交项目的存在性检测，返回 检测路径 -> 项目列表 的映射
+
+    缓存中未过期的结果直接使用；其余可检测的项目 exists 先置为 None（未知），等待结果回填。
+    """
+    waiting = {}
+    for p in projects:
+        path = p['check_path']
+        if not path:
+            p['exists'] = True  # 远程路径无法检测，视为存在
+            continue
+        if cache:
+            hit, state = cache.lookup(path)
+            if hit:
+                p['exists'] = state
+                continue
+        p['exists'] = None
+        waiting.setdefault(path, []).append(p)
+    prober.submit(list(waiting))
+    return waiting
+
+
+def apply_probe_results(waiting, results, cache=None):
+    """回填检测结果（并写入缓存），返回被更新的项目列表"""
+    changed = []
+    for path, state in results:
+        if cache:
+            cache.store(path, state)
+        for p in waiting.pop(path, ()):
+            p['exists'] = state
+            changed.append(p)
+    return changed
+
+
+def check_projects(projects):
+    """同步检测项目存在性（使用跨运行缓存）"""
+    prober = ExistenceProber()
+    cache = ExistsCache()
+    waiting = probe_projects(projects, prober, cache)
+    apply_probe_results(waiting, prober.wait(), cache)
+    cache.save()
+
+
+def load_projects(db_path, probe=True, reader=None):
+    """从数据库加载项目
+
+    probe 为 False 时只提交后台检测，由调用方通过 ExistenceProber 回填结果。
+    """
+    if not db_path or not os.path.exists(db_path):
+        return []
+
+    try:
+        _, projects = load_records(db_path, reader)
+        if probe:
+            check_projects(projects)
         return projects
     except:
         return []
 
 
-def save_projects(db_path, projects):
-    """保存项目到数据库"""
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM ItemTable WHERE key='history.recentlyOpenedPathsList'")
-        row = cursor.fetchone()
+def merge_sources(sources):
+    """合并多个来源的项目列表
+
+    sources 为 [(来源名称, 项目列表)]，各列表按最近打开顺序逐位交错合并；
+    同一 URI 只保留第一条，记录 source（首个来源）和 sources（所有来源）。
+    """
+    if len(sources) == 1:
+        name, projects = sources[0]
+        for p in projects:
+            p['source'] = name
+            p['sources'] = [name]
+        return list(projects)
+
+    merged = []
+    seen = {}
+    longest = max((len(projects) for _, projects in sources), default=0)
+    for rank in range(longest):
+        for name, projects in sources:
+            if rank >= len(projects):
+                continue
+            p = projects[rank]
+            first = seen.get(p['uri'])
+            if first is None:
+                p['source'] = name
+                p['sources'] = [name]
+                seen[p['uri']] = p
+                merged.append(p)
+            elif name not in first['sources']:
+                first['sources'].append(name)
+    return merged
+
+
+def project_tag(p, primary=None):
+    """项目标签：非主来源的项目附加来源名称，如 Insiders · SSH: host"""
+    source = p.get('source')
+    if source and primary and source != primary:
+        return f"{source} · {p['tag']}" if p['tag'] else source
+    return p['tag']
+
+
+def load_sources(db_paths, probe=True):
+    """并行加载多个来源的项目并合并"""
+    with ThreadPoolExecutor(max_workers=max(1, len(db_paths))) as pool:
+        lists = list(pool.map(lambda item: load_projects(item[1], probe=False), db_paths))
+    projects = merge_sources([(name, projects) for (name, _), projects in zip(db_paths, lists)])
+    if probe:
+        check_projects(projects)
+    return projects
+
+
+# 写入：忙等待超时（秒）、重试次数、退避基数（秒）
+WRITE_BUSY_TIMEOUT = 2.0
+WRITE_RETRIES = 5
+WRITE_BACKOFF = 0.05
+
+
+def blob_digest(blob):
+    """最近打开列表原始 JSON 的哈希"""
+    raw = blob.encode('utf-8') if isinstance(blob, str) else blob
+    return hashlib.sha1(raw).hexdigest()
+
+
+def apply_history_op(entries, op, removed):
+    """对条目列表应用一项操作，被删除的条目记入 removed"""
+    if op['op'] == 'remove':
+        uris = set(op['uris'])
+        kept = []
+        for entry in entries:
+            uri = entry_uri(entry)
+            if uri in uris:
+                removed[uri] = entry
+            else:
+                kept.append(entry)
+        return kept
+
+    if op['op'] == 'restore':
+        # 按原位置恢复；VSCode 已重新记录的 URI 不重复添加
+        entries = list(entries)
+        present = {entry_uri(entry) for entry in entries}
+        for pos, entry in sorted(op['items'], key=lambda item: item[0]):
+            if entry_uri(entry) not in present:
+                entries.insert(min(pos, len(entries)), entry)
+                present.add(entry_uri(entry))
+        return entries
 
-        if row:
+    return entries
+
+
+def commit_history(db_path, ops, base_digest=None):
+    """以事务方式修改最近打开列表
+
+    ops 为按顺序应用的操作列表: {'op': 'remove', 'uris': [...]} 删除，
+    {'op': 'restore', 'items': [[位置, 原始条目], ...]} 恢复，全部在同一个事务中提交。
+    修改在 BEGIN IMMEDIATE 持有写锁期间基于数据库当前内容应用，VSCode 在我们读取之后
+    写入的条目会被保留（合并）而不是被覆盖；base_digest 为读取时的内容哈希，
+    与当前内容比较即可知道是否发生了并发修改。数据库忙时按指数退避重试。
+
+    返回字典: ok 是否成功, error 错误信息, removed 被删除的 URI -> 原始条目,
+    merged 是否合并了并发修改, digest 写入后的内容哈希
+    """
+    result = {'ok': False, 'error': None, 'removed': {}, 'merged': False, 'digest': None}
+
+    for attempt in range(WRITE_RETRIES):
+        conn = None
+        try:
+            conn = sqlite3.connect(db_path, timeout=WRITE_BUSY_TIMEOUT, isolation_level=None)
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute("SELECT value FROM ItemTable WHERE key=?", (HISTORY_KEY,)).fetchone()
+            if not row:
+                conn.execute('ROLLBACK')
+                result['error'] = '数据库中没有最近打开列表'
+                return result
+
+            result['merged'] = base_digest is not None and blob_digest(row[0]) != base_digest
             data = json.loads(row[0])
-            keep_uris = {p['uri'] for p in projects}
 
-            new_entries = []
-            for entry in data.get('entries', []):
-                uri = entry.get('folderUri') or entry.get('fileUri') or \
-                      (entry.get('workspace', {}) or {}).get('configPath', '')
-                if uri in keep_uris:
-                    new_entries.append(entry)
+            entries = data.get('entries', [])
+            removed = {}
+            for op in ops:
+                entries = apply_history_op(entries, op, removed)
+
+            data['entries'] = entries
+            blob = json.dumps(data, ensure_ascii=False)
+            conn.execute("UPDATE ItemTable SET value=? WHERE key=?", (blob, HISTORY_KEY))
+            conn.execute('COMMIT')
+
+            result.update(ok=True, error=None, removed=removed, digest=blob_digest(blob))
+            return result
+        except sqlite3.OperationalError as e:
+            busy = 'locked' in str(e) or 'busy' in str(e)
+            result['error'] = '数据库被占用' if busy else str(e)
+            if not busy:
+                return result
+            time.sleep(WRITE_BACKOFF * (2 ** attempt))
+        except (sqlite3.Error, ValueError) as e:
+            result['error'] = str(e)
+            return result
+        finally:
+            if conn is not None:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.close()
+    return result
+
 
-            data['entries'] = new_entries
-            cursor.execute("UPDATE ItemTable SET value=? WHERE key='history.recentlyOpenedPathsList'",
-                          (json.dumps(data, ensure_ascii=False),))
-            conn.commit()
+# 操作日志：空闲多久后写入数据库、写入失败后的重试间隔（秒）
+JOURNAL_IDLE = 1.5
+JOURNAL_RETRY = 5.0
 
-        conn.close()
-    except:
+
+class OpJournal:
+    """待写入数据库的操作日志
+
+    删除/恢复先记录在内存中，并追加到磁盘日志文件（每条写入后 fsync），
+    由调用方在空闲或退出时通过 commit_history 一次性提交后移除。
+    程序异常退出时，下次启动读取日志文件即可补写未提交的操作。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.ops = []
+        self.next_id = 1
+        self.committing = set()  # 正在后台写入数据库的操作 id，不能再取消
+        self.written = os.path.exists(path)  # 磁盘上是否有日志文件
+        self._replay()
+
+    def _replay(self):
+        """读取日志文件中未提交的操作（忽略写到一半的末行）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                op = json.loads(line)
+            except ValueError:
+                continue
+            if op.get('op') == 'cancel':
+                self.ops = [o for o in self.ops if o['id'] != op['id']]
+            else:
+                self.ops.append(op)
+            self.next_id = max(self.next_id, op['id'] + 1)
+
+    def _write(self, record):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.written = True
+        except OSError:
+            pass  # 日志只用于崩溃恢复，写入失败不影响本次会话
+
+    def append(self, op, **fields):
+        """记录一项操作，返回操作 id"""
+        record = {'id': self.next_id, 'op': op, **fields}
+        self.next_id += 1
+        self.ops.append(record)
+        self._write(record)
+        return record['id']
+
+    def cancel(self, op_id):
+        """撤销尚未提交的操作，返回是否找到（正在写入的操作无法撤销）"""
+        if op_id in self.committing:
+            return False
+        for i, op in enumerate(self.ops):
+            if op['id'] == op_id:
+                del self.ops[i]
+                self._write({'id': op_id, 'op': 'cancel'})
+                return True
+        return False
+
+    def commit(self, ids):
+        """移除已提交的操作；提交期间新记录的操作重写到日志文件中"""
+        self.ops = [op for op in self.ops if op['id'] not in ids]
+        if not self.ops:
+            self.clear()
+            return
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for op in self.ops:
+                    f.write(json.dumps(op, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # 保留原日志：重放时已提交的操作会再应用一次，删除和恢复都可重复执行
+
+    def clear(self):
+        """没有未提交的操作，清空日志"""
+        self.ops = []
+        if not self.written:
+            return
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        self.written = False
+
+
+USAGE_HALF_LIFE = 7 * 86400  # 打开记录的权重减半时间（秒）
+USAGE_KEEP = 10000           # 保留的原始打开记录数
+USAGE_MRU_HALF = 10          # 最近打开列表中每隔多少项权重减半
+
+
+class UsageStore:
+    """本地打开记录（缓存目录中的 usage.db），用于按常用程度（frecency）排序
+
+    每次打开写入一条原始记录，同时增量更新该项目的物化得分。得分按指数衰减，
+    以 log2(衰减后的次数) + 时间/半衰期 的形式保存：各项目的得分不随时间变化即可直接比较，
+    排序时无需重新汇总原始记录。
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_cache_dir(), 'usage.db')
+        self.conn = None
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            self.conn.execute('CREATE TABLE IF NOT EXISTS opens (uri TEXT NOT NULL, at REAL NOT NULL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS frecency '
+                              '(uri TEXT PRIMARY KEY, score REAL NOT NULL)')
+        return self.conn
+
+    def scores(self):
+        """所有项目的物化得分 URI -> 得分，失败返回空字典"""
+        try:
+            return dict(self._connect().execute('SELECT uri, score FROM frecency'))
+        except sqlite3.Error:
+            return {}
+
+    def record(self, uris):
+        """记录一次打开并更新得分，返回这些项目的新得分"""
+        now = time.time() / USAGE_HALF_LIFE
+        updated = {}
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for uri in uris:
+                    conn.execute('INSERT INTO opens VALUES (?, ?)', (uri, time.time()))
+                    row = conn.execute('SELECT score FROM frecency WHERE uri = ?', (uri,)).fetchone()
+                    # 原得分换算为当前时间的衰减次数后加 1
+                    weight = 2 ** (row[0] - now) if row else 0
+                    updated[uri] = now + math.log2(weight + 1)
+                    conn.execute('INSERT OR REPLACE INTO frecency VALUES (?, ?)', (uri, updated[uri]))
+                conn.execute('DELETE FROM opens WHERE rowid <= (SELECT MAX(rowid) FROM opens) - ?',
+                             (USAGE_KEEP,))
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error:
+            return {}
+        return updated
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def rank_projects(projects, scores):
+    """按常用程度排序：衰减后的打开次数加上最近打开列表中的位置权重
+
+    列表第一项相当于刚打开过一次，每往后 USAGE_MRU_HALF 项权重减半；很久以前打开过的项目
+    衰减后不再压过最近使用的项目。没有打开记录时保持原顺序。
+    """
+    if not scores:
+        return projects
+    now = time.time() / USAGE_HALF_LIFE
+
+    def weight(item):
+        pos, p = item
+        w = 2 ** (-pos / USAGE_MRU_HALF)
+        score = scores.get(p['uri'])
+        if score is not None:
+            w += 2 ** (score - now)
+        return -w
+
+    return [p for _, p in sorted(enumerate(projects), key=weight)]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# 启动编辑器
+# ═══════════════════════════════════════════════════════════════════════════════
+
+IPC_TIMEOUT = 1.0      # 通过 VSCODE_IPC_HOOK_CLI 发送打开请求的超时（秒）
+LAUNCH_WORKERS = 4     # 同时进行的启动数
+LAUNCH_TIMEOUT = 10.0  # 启动命令超过该时间未退出视为卡住（秒）
+LAUNCH_DETACH_WAIT = 3.0  # detach 的命令超过该时间仍在运行视为已启动（秒）
+WORKSPACE_KEEP = 32    # 缓存目录中保留的工作区文件数
+
+
+def launch_target(p):
+    """项目的打开目标: ('folder' 或 'file', URI, 命令行参数)
+
+    工作区文件按文件传递，由编辑器识别为工作区打开。
+    """
+    kind = 'folder' if p['type'] == 'folder' else 'file'
+    uri = p['uri']
+    if uri.startswith('file://'):
+        return kind, uri, [p['full_path']]
+    return kind, uri, [f'--{kind}-uri', uri]
+
+
+def launch_batches(projects, new_window=False):
+    """将要打开的项目分批: [(是否新窗口, 项目列表)]
+
+    第一个项目复用当前窗口（new_window 时除外），其余项目在新窗口中打开，每批只需一次调用。
+    """
+    if not projects:
+        return []
+    if new_window:
+        return [(True, projects)]
+    batches = [(False, projects[:1])]
+    if len(projects) > 1:
+        batches.append((True, projects[1:]))
+    return batches
+
+
+def cli_open_args(vscode, projects, new_window=False):
+    """一次编辑器命令行调用打开多个项目的参数"""
+    args = [vscode, '-n' if new_window else '-r']
+    for p in projects:
+        args.extend(launch_target(p)[2])
+    return args
+
+
+def workspace_file(folders):
+    """获取多个文件夹组成的工作区文件，失败返回 None
+
+    文件按排序后的文件夹集合的哈希命名并保存在缓存目录中：相同的集合复用同一个文件，
+    编辑器也会复用该工作区的状态。复用时更新修改时间，超出 WORKSPACE_KEEP 个时删除最久未用的。
+    """
+    folders = sorted(set(folders))
+    directory = os.path.join(get_cache_dir(), 'workspaces')
+    key = hashlib.sha1('\n'.join(folders).encode('utf-8', 'surrogateescape')).hexdigest()
+    path = os.path.join(directory, f'{key}.code-workspace')
+    try:
+        os.utime(path)
+        return path
+    except OSError:
+        pass
+    if not write_json_file(path, {'folders': [{'path': folder} for folder in folders]}):
+        return None
+    prune_workspaces(directory)
+    return path
+
+
+def prune_workspaces(directory, keep=WORKSPACE_KEEP):
+    """按修改时间删除最久未用的工作区文件，只保留 keep 个"""
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith('.code-workspace')]
+        if len(names) <= keep:
+            return
+        paths = sorted((os.path.join(directory, name) for name in names),
+                       key=os.path.getmtime, reverse=True)
+        for path in paths[keep:]:
+            os.remove(path)
+    except OSError:
         pass
 
 
+def ipc_hook():
+    """当前编辑器终端的 CLI IPC 套接字（VSCODE_IPC_HOOK_CLI），不可用时返回 None
+
+    只使用 HTTP 协议的 CLI 套接字；主进程的 IPC 套接字协议不同，不直接连接。
+    WSL 和远程会话中的套接字属于远程服务端，本地路径无法通过它打开，也不使用。
+    """
+    path = os.environ.get('VSCODE_IPC_HOOK_CLI')
+    if not path or not hasattr(socket, 'AF_UNIX') or detect_os() not in ('linux', 'macos'):
+        return None
+    return path if os.path.exists(path) else None
+
+
+def ipc_open(hook, projects, new_window=False, timeout=IPC_TIMEOUT):
+    """通过 CLI IPC 套接字请求编辑器打开项目，成功返回 True"""
+    folders, files = [], []
+    for p in projects:
+        kind, uri, _ = launch_target(p)
+        (folders if kind == 'folder' else files).append(uri)
+    body = json.dumps({
+        'type': 'open',
+        'folderURIs': folders,
+        'fileURIs': files,
+        'forceNewWindow': new_window,
+        'forceReuseWindow': not new_window,
+    }).encode('utf-8')
+    request = (f'POST / HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+               f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n').encode('ascii') + body
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(hook)
+            sock.sendall(request)
+            response = b''
+            while b'\r\n' not in response:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                response += chunk
+    except OSError:
+        return False
+    status = response.split(b'\r\n', 1)[0].split()
+    return len(status) >= 2 and status[1] == b'200'
+
+
+class Launcher:
+    """后台启动外部命令：限制并发、等待退出回收子进程、超时处理并汇报结果
+
+    每个任务在工作线程中执行并等待命令退出，不留下僵尸进程。命令超过 LAUNCH_TIMEOUT
+    未退出时终止并记为失败；detach 的命令（编辑器本体、文件管理器可能一直运行）超过
+    LAUNCH_DETACH_WAIT 仍在运行即视为已启动，不终止，在后台继续回收。
+    """
+
+    def __init__(self, workers=LAUNCH_WORKERS, timeout=LAUNCH_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.tasks = queue.Queue()      # 待执行的 (名称列表, 函数)
+        self.results = queue.Queue()    # 执行结果 (名称列表, 错误信息或 None)
+        self.pending = 0                # 尚未出结果的任务数
+        self.threads = []
+
+    def submit(self, names, func):
+        """提交任务：func() 返回错误信息，成功返回 None"""
+        with self.lock:
+            self.pending += 1
+            self.tasks.put((names, func))
+            if len(self.threads) < self.workers and len(self.threads) < self.pending:
+                t = threading.Thread(target=self._worker, daemon=True)
+                t.start()
+                self.threads.append(t)
+
+    def submit_command(self, names, args, shell=False, check=True, detach=False):
+        """提交启动命令"""
+        self.submit(names, lambda: self.run(args, shell, check, detach))
+
+    def run(self, args, shell=False, check=True, detach=False):
+        """执行命令并等待退出，返回错误信息或 None"""
+        try:
+            # 错误输出写入临时文件：编辑器等后代进程继承管道时不会卡住等待
+            with tempfile.TemporaryFile() as err:
+                proc = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                        stderr=err, shell=shell)
+                try:
+                    code = proc.wait(min(self.timeout, LAUNCH_DETACH_WAIT) if detach else self.timeout)
+                except subprocess.TimeoutExpired:
+                    if detach:
+                        threading.Thread(target=proc.wait, daemon=True).start()
+                        return None
+                    proc.kill()
+                    proc.wait()
+                    return f'{os.path.basename(args[0])} 超时未退出'
+                if code == 0 or not check:
+                    return None
+                err.seek(0)
+                lines = err.read().decode('utf-8', 'replace').strip().splitlines()
+                return lines[-1] if lines else f'{os.path.basename(args[0])} 退出码 {code}'
+        except OSError as e:
+            return f'无法执行 {os.path.basename(args[0])}: {e.strerror or e}'
+
+    def _worker(self):
+        while True:
+            names, func = self.tasks.get()
+            try:
+                error = func()
+            except Exception as e:
+                error = str(e)
+            with self.lock:
+                self.pending -= 1
+                self.results.put((names, error))
+
+    def busy(self):
+        """是否还有未完成的任务"""
+        return bool(self.pending) or not self.results.empty()
+
+    def poll(self):
+        """取出已完成的结果列表"""
+        done = []
+        while True:
+            try:
+                done.append(self.results.get_nowait())
+            except queue.Empty:
+                return done
+
+    def wait(self, timeout=None):
+        """阻塞直到所有任务完成（或超时），返回全部结果"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = self.poll()
+        while self.busy() and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.01)
+            done.extend(self.poll())
+        return done
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# 数据库监视
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# 监视模式：变化合并等待时间、最长延迟、无 inotify 时的轮询间隔（秒）
+WATCH_DEBOUNCE = 0.3
+WATCH_MAX_DELAY = 2.0
+WATCH_POLL = 1.0
+
+
+class DbWatcher:
+    """监视 state.vscdb 及其 -wal 文件的变化
+
+    Linux 下通过 ctypes 调用 inotify（无额外依赖）；其他平台及 WSL 的 /mnt 挂载
+    （drvfs 不产生 inotify 事件）退化为定时比较文件大小和修改时间。
+    VSCode 的连续写入会被合并：最后一次变化后静默 WATCH_DEBOUNCE 秒才触发，
+    持续写入时最长等待 WATCH_MAX_DELAY 秒。
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.names = {os.path.basename(db_path), os.path.basename(db_path) + '-wal'}
+        self.fd = None
+        self.first = None    # 本轮变化的首个事件时间
+        self.last = None     # 本轮变化的最后事件时间
+        self.stamp = db_stamp(db_path)
+        self.next_poll = 0
+        if sys.platform.startswith('linux') and not (
+                detect_os() == 'wsl' and mount_of(os.path.abspath(db_path)).startswith('/mnt/')):
+            self._init_inotify()
+
+    def _init_inotify(self):
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+            if fd < 0:
+                return
+            mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            # 监视所在目录，-wal 文件被删除重建后仍能收到事件
+            if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+                os.close(fd)
+                return
+            self.fd = fd
+        except (OSError, AttributeError):
+            self.fd = None
+
+    def fileno(self):
+        """inotify 文件描述符（可用于 select），不可用时为 None"""
+        return self.fd
+
+    def _mark(self, now):
+        if self.first is None:
+            self.first = now
+        self.last = now
+
+    def _read_events(self, now):
+        """读取 inotify 事件，记录相关文件的变化"""
+        while True:
+            try:
+                buf = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return
+            except OSError:
+                return
+            if not buf:
+                return
+            offset = 0
+            while offset + 16 <= len(buf):
+                _, _, _, length = struct.unpack_from('iIII', buf, offset)
+                name = buf[offset + 16:offset + 16 + length].split(b'\0', 1)[0]
+                offset += 16 + length
+                if os.fsdecode(name) in self.names:
+                    self._mark(now)
+
+    def timeout(self):
+        """距下次需要检查的时间（秒），None 表示只需等待 inotify 事件"""
+        now = time.monotonic()
+        if self.first is not None:
+            due = min(self.last + WATCH_DEBOUNCE, self.first + WATCH_MAX_DELAY)
+            return max(0, due - now)
+        if self.fd is None:
+            return max(0, self.next_poll - now)
+        return None
+
+    def poll(self):
+        """检查变化，一轮连续写入结束时返回 True"""
+        now = time.monotonic()
+        if self.fd is not None:
+            self._read_events(now)
+        elif now >= self.next_poll:
+            self.next_poll = now + WATCH_POLL
+            stamp = db_stamp(self.db_path)
+            if stamp != self.stamp:
+                self.stamp = stamp
+                self._mark(now)
+
+        if self.first is None:
+            return False
+        if now - self.last >= WATCH_DEBOUNCE or now - self.first >= WATCH_MAX_DELAY:
+            self.first = self.last = None
+            return True
+        return False
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# 模糊搜索
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# 打分参数（参考 fzf）
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+BONUS_BOUNDARY = 8           # 单词开头（前一个字符不是字母数字）
+BONUS_SEPARATOR = 9          # 路径分隔符之后或字段开头
+BONUS_CONSECUTIVE = 4        # 连续匹配
+BONUS_FIRST_CHAR_MULTIPLIER = 2
+
+# 搜索的字段及权重
+SEARCH_FIELDS = (('name', 4), ('pinyin', 3), ('initials', 3), ('tag', 2),
+                 ('display_path', 1), ('full_path', 1))
+
+SEARCH_CACHE_SIZE = 32       # 缓存最近的查询结果数
+TRIGRAM_MIN_PROJECTS = 5000  # 项目数达到该值时启用三元组索引（用于筛选精确词）
+SEARCH_ASYNC_MIN = 2000      # 项目数达到该值时在后台线程搜索
+SEARCH_CHUNK = 1000          # 后台搜索每批打分的项目数（批间检查取消并回报部分结果）
+SEARCH_PARTIAL = 200         # 部分结果保留的最佳匹配数
+SEARCH_POLL = 0.02           # 后台搜索进行中界面的刷新间隔（秒）
+SHARD_MIN_PROJECTS = 100000  # 候选项目数达到该值时分片到多个进程并行打分
+SHARD_WORKERS = min(8, os.cpu_count() or 1)  # 分片打分的进程数
+FIELD_SEP = '\x1f'           # 共享内存中字段之间的分隔符
+
+# 字符掩码：字母和数字各占一位，其他字符散列到剩余的位
+MASK_BITS = {c: 1 << i for i, c in enumerate('abcdefghijklmnopqrstuvwxyz0123456789')}
+
+
+def fold(s):
+    """搜索用的规范化：NFKC 兼容分解（全角转半角等）后大小写折叠"""
+    return unicodedata.normalize('NFKC', s).casefold()
+
+
+def score_fields(fields, terms):
+    """项目得分：每个词取各字段加权得分的最大值再相加，有词不匹配返回 None"""
+    total = 0
+    for term in terms:
+        best = None
+        for text, weight in fields:
+            s = fuzzy_score(text, term)
+            if s is not None and (best is None or s * weight > best):
+                best = s * weight
+        if best is None:
+            return None
+        total += best
+    return total
+
+
+# 结构化查询的限定字段
+QUERY_FIELDS = ('tag', 'type', 'exists', 'host', 'under')
+FACET_FIELDS = ('tag', 'type', 'host')  # 预先建立位图的字段
+QUERY_TOKEN_RE = re.compile(r'\S*"[^"]*"?\S*|\S+')
+EXISTS_VALUES = ((True, ('yes', 'true', '1')), (False, ('no', 'false', '0')),
+                 (None, ('unknown', '?')))
+
+
+class Query:
+    """解析后的结构化查询
+
+    语法（空格分隔，各条件同时满足）:
+      文本           模糊匹配名称、标签和路径，参与打分
+      'src           精确匹配（作为子串出现），参与打分；项目较多时由三元组倒排表直接筛选
+      tag:ssh        标签包含 ssh           type:folder   类型 (folder/file/workspace，可写前缀)
+      exists:no      存在状态 (yes/no/unknown)  host:box   远程主机包含 box
+      under:d:/src   路径位于该目录下        /正则/        正则匹配名称或路径
+      -条件          取反，如 -tag:wsl、-exists:yes、-temp
+    值中有空格时用双引号括起，如 under:"d:/my projects"。
+    """
+
+    def __init__(self, text):
+        self.terms = []      # 打分的文本词
+        self.parts = []      # 所有条件 (类型, 值, 是否取反)，类型为 text/exact/regex 或限定字段
+        for raw in QUERY_TOKEN_RE.findall(text):
+            token = fold(raw)
+            negate = token.startswith('-') and len(token) > 1
+            if negate:
+                token, raw = token[1:], raw[1:]
+            kind, sep, value = token.partition(':')
+            if not sep or kind not in QUERY_FIELDS:
+                kind, value = 'text', token
+                if len(value) > 2 and value.startswith('/') and value.endswith('/'):
+                    try:
+                        # 正则用原文编译（折叠会改写 \D、[A-Z] 等），忽略大小写匹配折叠后的文本
+                        value = re.compile(raw[1:-1], re.IGNORECASE)
+                        kind = 'regex'
+                    except re.error:
+                        pass
+                elif value.startswith("'"):
+                    # 取反的文本本来就按子串判断
+                    kind, value = ('text' if negate else 'exact'), value[1:]
+            if kind != 'regex':
+                value = value.replace('"', '')
+                if not value:
+                    continue  # 还没输入值的限定词不起作用
+                if kind == 'under':
+                    value = value.replace('\\', '/')
+            if kind in ('text', 'exact') and not negate:
+                self.terms.append(value)
+            self.parts.append((kind, value, negate))
+        self.key = ' '.join(f"{'-' if negate else ''}{kind}:"
+                            f"{value.pattern if kind == 'regex' else value}"
+                            for kind, value, negate in self.parts)
+        self.uses_exists = any(kind == 'exists' for kind, _, _ in self.parts)
+
+    def narrows(self, base):
+        """本查询的结果是否一定包含在 base 的结果中（用于在 base 的结果中继续筛选）
+
+        base 的每个条件都要被本查询中同类型、值更长的非取反条件蕴含（under: 须是其子目录）；
+        取反和正则条件无法判断。
+        """
+        for kind, value, negate in base.parts:
+            if negate or kind == 'regex':
+                return False
+            if kind == 'under':
+                implied = lambda v: v == value or v.startswith(value.rstrip('/') + '/')
+            else:
+                implied = lambda v: v.startswith(value)
+            if not any(k == kind and not n and implied(v) for k, v, n in self.parts):
+                return False
+        return True
+
+
+def exists_state(value):
+    """exists: 的值对应的存在状态列表（可写前缀）"""
+    return [state for state, words in EXISTS_VALUES if any(w.startswith(value) for w in words)]
+
+
+def project_host(p):
+    """远程项目的主机名（ssh-remote+host -> host），本地项目为空"""
+    if not p['uri'].startswith('vscode-remote://'):
+        return ''
+    netloc = unquote(urlparse(p['uri']).netloc)
+    return netloc.partition('+')[2] or netloc
+
+
+def bitmap_of(positions, n):
+    """位置列表转为位图（Python 整数，第 i 位表示第 i 个项目）"""
+    bits = bytearray((n + 7) // 8)
+    for i in positions:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, 'little')
+
+
+BYTE_BITS = [[j for j in range(8) if b >> j & 1] for b in range(256)]
+
+
+def bitmap_positions(bitmap):
+    """位图中为 1 的位置（升序）"""
+    positions = []
+    for k, b in enumerate(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')):
+        if b:
+            base = k << 3
+            positions.extend(base + j for j in BYTE_BITS[b])
+    return positions
+
+
+def trigrams_of(fields):
+    """字段文本中的所有三元组"""
+    return {text[j:j + 3] for text, _ in fields for j in range(len(text) - 2)}
+
+
+def char_mask(s):
+    """字符存在掩码（64 位）：查询的掩码不是其子集时一定不匹配"""
+    mask = 0
+    for c in set(s):
+        bit = MASK_BITS.get(c)
+        mask |= bit if bit is not None else 1 << (36 + ord(c) % 28)
+    return mask
+
+
+def char_bonus(text, pos):
+    """text[pos] 所在位置的边界加分"""
+    if pos == 0:
+        return BONUS_SEPARATOR
+    prev = text[pos - 1]
+    if prev in '/\\':
+        return BONUS_SEPARATOR
+    if not prev.isalnum():
+        return BONUS_BOUNDARY
+    return 0
+
+
+def fuzzy_score(text, pattern):
+    """fzf 风格的模糊匹配得分，不匹配返回 None（text 和 pattern 均已折叠）
+
+    先向前扫描找到最早的匹配结束位置，再从该位置向回扫描取最短的匹配区间；
+    单词开头、路径分隔符之后和连续匹配加分，间隔扣分。
+    """
+    pos = -1
+    for c in pattern:
+        pos = text.find(c, pos + 1)
+        if pos < 0:
+            return None
+
+    positions = [pos]
+    for c in reversed(pattern[:-1]):
+        pos = text.rfind(c, 0, pos)
+        positions.append(pos)
+    positions.reverse()
+
+    score = 0
+    prev = -2
+    chunk_bonus = 0  # 当前连续段首字符的加分
+    for i, pos in enumerate(positions):
+        bonus = char_bonus(text, pos)
+        if pos == prev + 1:
+            bonus = max(bonus, chunk_bonus, BONUS_CONSECUTIVE)
+        else:
+            if i:
+                score += SCORE_GAP_START + SCORE_GAP_EXTENSION * (pos - prev - 2)
+            chunk_bonus = bonus
+        if i == 0:
+            bonus *= BONUS_FIRST_CHAR_MULTIPLIER
+        score += SCORE_MATCH + bonus
+        prev = pos
+    return max(score, 1)
+
+
+class ShardStore:
+    """共享内存中的搜索数据，供进程池分片打分时直接读取，每次查询无需传递项目列表
+
+    布局: 项目数 n (uint64) | 文本偏移 (n+1 个 uint64) | 字符掩码 (n 个 uint64) | 文本
+    每个项目的文本为各字段 "权重+折叠后的文本" 以 \\x1f 连接后的 UTF-8 编码。
+    """
+
+    def __init__(self, fields, masks):
+        blobs = [FIELD_SEP.join(f'{weight}{text}' for text, weight in f)
+                 .encode('utf-8', 'surrogatepass') for f in fields]
+        offsets = array('Q', [0])
+        offsets.extend(itertools.accumulate(len(blob) for blob in blobs))
+        n = len(blobs)
+        head = 8 + 8 * (n + 1) + 8 * n
+        self.shm = shared_memory.SharedMemory(create=True, size=head + offsets[-1] + 1)
+        buf = self.shm.buf
+        struct.pack_into('<Q', buf, 0, n)
+        buf[8:8 + 8 * (n + 1)] = offsets.tobytes()
+        buf[8 + 8 * (n + 1):head] = array('Q', masks).tobytes()
+        buf[head:head + offsets[-1]] = b''.join(blobs)
+        self.name = self.shm.name
+
+    def close(self):
+        """删除并释放共享内存"""
+        try:
+            self.shm.unlink()
+        except OSError:
+            pass
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+
+
+_attached_stores = OrderedDict()  # 分片进程中已打开的共享内存
+
+
+def attach_store(name):
+    """在分片进程中打开共享内存（复用已打开的，只保留最近两个）"""
+    shm = _attached_stores.get(name)
+    if shm is None:
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python 3.13 之前没有 track 参数；子进程与主进程共用同一个资源跟踪进程，
+            # 重复登记不影响主进程负责删除
+            shm = shared_memory.SharedMemory(name=name)
+        _attached_stores[name] = shm
+        while len(_attached_stores) > 2:
+            _, old = _attached_stores.popitem(last=False)
+            try:
+                old.close()
+            except BufferError:
+                pass
+    return shm
+
+
+def score_shard(name, candidates, terms, qmask):
+    """在分片进程中对一组候选项目打分，返回按得分排序的 [(-得分, 位置)]"""
+    buf = attach_store(name).buf
+    n = struct.unpack_from('<Q', buf, 0)[0]
+    offsets = buf[8:8 + 8 * (n + 1)].cast('Q')
+    masks = buf[8 + 8 * (n + 1):8 + 8 * (2 * n + 1)].cast('Q')
+    base = 8 + 8 * (2 * n + 1)
+    scored = []
+    try:
+        for i in candidates:
+            if masks[i] & qmask != qmask:
+                continue
+            raw = bytes(buf[base + offsets[i]:base + offsets[i + 1]]).decode('utf-8', 'surrogatepass')
+            fields = [(f[1:], int(f[0])) for f in raw.split(FIELD_SEP)] if raw else []
+            total = score_fields(fields, terms)
+            if total is not None:
+                scored.append((-total, i))
+    finally:
+        offsets.release()
+        masks.release()
+    scored.sort()
+    return scored
+
+
+@functools.lru_cache(maxsize=1)
+def shard_pool():
+    """分片打分的进程池（首次使用时创建）"""
+    return ProcessPoolExecutor(max_workers=SHARD_WORKERS,
+                               mp_context=multiprocessing.get_context('spawn'))
+
+
+class ProjectIndex:
+    """项目搜索索引：预先折叠各字段并计算字符掩码，掩码不满足的项目不参与打分
+
+    按 URI 保存每个项目的索引数据，项目列表变化时只处理新增、删除或修改的记录。
+    项目数达到 TRIGRAM_MIN_PROJECTS 时额外维护三元组倒排索引：查询中有三个字符以上的
+    精确词（'src）时，候选项目由倒排表求交集得到，不再逐个扫描；模糊词仍逐个打分。
+    最近的查询结果按 LRU 缓存；新查询以缓存的查询开头时（继续输入），
+    只在该查询的结果中搜索。项目列表变化时缓存丢弃。
+    search 可在后台线程中调用，与 update 之间用锁保护。
+    项目数达到 SHARD_MIN_PROJECTS 时索引数据同时写入共享内存，大量候选由进程池分片并行打分。
+    """
+
+    def __init__(self, projects=()):
+        self.lock = threading.Lock()
+        self.version = 0            # 项目列表版本，变化后丢弃旧列表的搜索结果
+        self.projects = []
+        self.entries = {}           # URI -> (项目记录, 字段, 掩码)
+        self.trigrams = None        # 三元组 -> URI 集合（未启用时为 None）
+        self.cache = OrderedDict()  # 查询 -> (解析后的查询, 结果)
+        self.fields = []            # 每个项目的 [(折叠后的字段文本, 权重)]
+        self.masks = []             # 每个项目所有字段的字符掩码
+        self.info = []              # 每个项目的限定字段 (tag/type/host/paths)
+        self.facets = None          # 字段 -> {值: 位图}，首次使用时建立
+        self.exists_bits = None     # 存在状态 -> 位图，存在性变化后重建
+        self.position = {}          # URI -> 在项目列表中的位置
+        self.store = None           # 共享内存中的索引数据（分片打分用）
+        self.retired = []           # 已替换的共享内存，进行中的搜索可能仍在使用
+        self.update(projects)
+
+    def update(self, projects):
+        """更新为新的项目列表（增量：按 URI 比较，未变化的记录直接复用）"""
+        with self.lock:
+            self._update(list(projects))
+            self.version += 1
+
+    def _update(self, projects):
+        if self.trigrams is None and len(projects) >= TRIGRAM_MIN_PROJECTS:
+            self.trigrams = {}
+            for uri, (_, fields, _, _) in self.entries.items():
+                self._add_trigrams(uri, fields)
+
+        current = {p['uri'] for p in projects}
+        for uri in [uri for uri in self.entries if uri not in current]:
+            self._remove(uri)
+        for p in projects:
+            entry = self.entries.get(p['uri'])
+            if entry is None or entry[0] is not p:
+                if entry is not None:
+                    self._remove(p['uri'])
+                self._add(p)
+
+        self.projects = projects
+        entries = [self.entries[p['uri']] for p in projects]
+        self.fields = [fields for _, fields, _, _ in entries]
+        self.masks = [mask for _, _, mask, _ in entries]
+        self.info = [info for _, _, _, info in entries]
+        self.position = {p['uri']: i for i, p in enumerate(projects)}
+        self.cache.clear()
+        self.facets = None
+        self.exists_bits = None
+
+        # 共享内存随列表重建；上一次替换下来的在这次才释放，留给进行中的搜索
+        for store in self.retired:
+            store.close()
+        self.retired = [self.store] if self.store else []
+        self.store = None
+        if HAS_SHARED_MEMORY and SHARD_WORKERS > 1 and len(projects) >= SHARD_MIN_PROJECTS:
+            try:
+                self.store = ShardStore(self.fields, self.masks)
+            except (OSError, ValueError):
+                pass
+
+    def close(self):
+        """释放共享内存"""
+        with self.lock:
+            for store in self.retired + [self.store]:
+                if store:
+                    store.close()
+            self.retired = []
+            self.store = None
+
+    def _add(self, p):
+        fields = [(fold(p.get(key) or ''), weight) for key, weight in SEARCH_FIELDS]
+        fields = [(text, weight) for text, weight in fields if text]
+        mask = char_mask(''.join(text for text, _ in fields))
+        paths = tuple(fold(path).replace('\\', '/') for path in (p['full_path'], p['display_path'])
+                      if path)
+        info = {'tag': fold(p['tag']), 'type': p['type'], 'host': fold(project_host(p)),
+                'paths': paths}
+        self.entries[p['uri']] = (p, fields, mask, info)
+        if self.trigrams is not None:
+            self._add_trigrams(p['uri'], fields)
+
+    def _remove(self, uri):
+        _, fields, _, _ = self.entries.pop(uri)
+        if self.trigrams is not None:
+            for gram in trigrams_of(fields):
+                posting = self.trigrams.get(gram)
+                if posting is not None:
+                    posting.discard(uri)
+                    if not posting:
+                        del self.trigrams[gram]
+
+    def _add_trigrams(self, uri, fields):
+        for gram in trigrams_of(fields):
+            self.trigrams.setdefault(gram, set()).add(uri)
+
+    def substring_candidates(self, terms):
+        """由三元组倒排表求出可能包含所有长精确词的位置；无法使用倒排索引时返回 None（需持有锁）"""
+        grams = {term[j:j + 3] for term in terms if len(term) >= 3 for j in range(len(term) - 2)}
+        if self.trigrams is None or not grams:
+            return None
+        postings = sorted((self.trigrams.get(gram, ()) for gram in grams), key=len)
+        uris = set(postings[0])
+        for posting in postings[1:]:
+            if not uris:
+                break
+            uris &= posting
+        return sorted(self.position[uri] for uri in uris if uri in self.position)
+
+    def lookup(self, query):
+        """已缓存的查询结果（空查询返回全部），没有时返回 None"""
+        query = Query(query)
+        if not query.parts:
+            return list(range(len(self.projects)))
+        with self.lock:
+            cached = self.cache.get(query.key)
+        return cached[1] if cached else None
+
+    def invalidate_exists(self):
+        """项目存在状态变化：重建存在状态位图，丢弃用到 exists: 的缓存结果"""
+        with self.lock:
+            self.exists_bits = None
+            for key in [k for k, (q, _) in self.cache.items() if q.uses_exists]:
+                del self.cache[key]
+
+    def facet_bitmap(self, kind, value):
+        """限定字段条件对应的位图（需持有锁）"""
+        n = len(self.projects)
+        if kind == 'exists':
+            if self.exists_bits is None:
+                groups = {True: [], False: [], None: []}
+                for i, p in enumerate(self.projects):
+                    groups[p.get('exists', True)].append(i)
+                self.exists_bits = {state: bitmap_of(ps, n) for state, ps in groups.items()}
+            bitmap = 0
+            for state in exists_state(value):
+                bitmap |= self.exists_bits[state]
+            return bitmap
+
+        if self.facets is None:
+            self.facets = {}
+            for field in FACET_FIELDS:
+                groups = {}
+                for i, info in enumerate(self.info):
+                    groups.setdefault(info[field], []).append(i)
+                self.facets[field] = {v: bitmap_of(ps, n) for v, ps in groups.items()}
+        bitmap = 0
+        for v, bits in self.facets[kind].items():
+            if (v.startswith(value) if kind == 'type' else value in v):
+                bitmap |= bits
+        return bitmap
+
+    def facet_filter(self, query):
+        """限定字段条件合并后的位图，没有这类条件时返回 None（需持有锁）"""
+        full = (1 << len(self.projects)) - 1
+        bitmap = None
+        for kind, value, negate in query.parts:
+            if kind in FACET_FIELDS or kind == 'exists':
+                bits = self.facet_bitmap(kind, value)
+                bitmap = (full if bitmap is None else bitmap) & (full & ~bits if negate else bits)
+        return bitmap
+
+    @staticmethod
+    def filter_candidates(query, candidates, bitmap, fields, info, cancelled=None):
+        """按限定字段位图和非打分条件筛选候选位置，取消时返回 None
+
+        使用持锁时取得的快照，不持有锁：正则等逐项判断可能较慢，不能阻塞前台的 lookup。
+        """
+        if bitmap is not None:
+            if isinstance(candidates, range):
+                candidates = bitmap_positions(bitmap)
+            else:
+                allowed = set(bitmap_positions(bitmap))
+                candidates = [i for i in candidates if i in allowed]
+
+        checks = [(kind, value, negate) for kind, value, negate in query.parts
+                  if kind in ('under', 'regex', 'exact') or (kind == 'text' and negate)]
+        if not checks:
+            return candidates
+        kept = []
+        for n, i in enumerate(candidates):
+            if n % SEARCH_CHUNK == 0 and cancelled and cancelled():
+                return None
+            for kind, value, negate in checks:
+                if kind == 'under':
+                    hit = any(path == value.rstrip('/') or path.startswith(value.rstrip('/') + '/')
+                              for path in info[i]['paths'])
+                elif kind == 'regex':
+                    hit = any(value.search(text) for text, _ in fields[i])
+                else:
+                    hit = any(value in text for text, _ in fields[i])
+                if hit == negate:
+                    break
+            else:
+                kept.append(i)
+        return kept
+
+    def search(self, query, cancelled=None, progress=None):
+        """返回匹配的项目索引，按得分从高到低（同分保持原顺序）
+
+        可在后台线程调用：cancelled() 返回 True 时中止并返回 None；
+        progress(部分结果) 在每批打分后以目前最佳的 SEARCH_PARTIAL 个结果调用。
+        """
+        query = Query(query)
+        if not query.parts:
+            return list(range(len(self.projects)))
+        key, terms = query.key, query.terms
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                return cached[1]
+
+            # 继续输入时查询一般越来越严格：新查询蕴含某个已缓存的查询时，
+            # 只在其中最长的那个的结果中筛选
+            bases = [k for k, (q, _) in self.cache.items() if query.narrows(q)]
+            if bases:
+                candidates = self.cache[max(bases, key=len)][1]
+            else:
+                # 精确词只可能出现在倒排表交集中的项目里，模糊词无法用倒排表筛选
+                candidates = self.substring_candidates(
+                    [value for kind, value, negate in query.parts if kind == 'exact'])
+                if candidates is None:
+                    candidates = range(len(self.projects))
+            bitmap = self.facet_filter(query)
+            # 筛选和打分只使用此刻的快照，项目列表随后被替换也不受影响
+            fields, masks, info, version = self.fields, self.masks, self.info, self.version
+            store = self.store
+
+        # 限定字段和非打分条件先用位图和简单判断筛掉
+        candidates = self.filter_candidates(query, candidates, bitmap, fields, info, cancelled)
+        if candidates is None:
+            return None  # 已取消
+
+        if not terms:
+            return self._remember(query, list(candidates), version)
+
+        qmask = char_mask(''.join(terms))
+        if store and len(candidates) >= SHARD_MIN_PROJECTS:
+            try:
+                result = self._search_shards(store, candidates, terms, qmask, cancelled, progress)
+            except Exception:
+                result = None  # 进程池不可用时在本进程中打分
+            else:
+                if result is None:
+                    return None  # 已取消
+                return self._remember(query, result, version)
+
+        scored = []
+        top = []
+        for start in range(0, len(candidates), SEARCH_CHUNK):
+            if cancelled and cancelled():
+                return None
+            chunk = []
+            for i in candidates[start:start + SEARCH_CHUNK]:
+                if masks[i] & qmask != qmask:
+                    continue
+                total = score_fields(fields[i], terms)
+                if total is not None:
+                    chunk.append((-total, i))
+            scored.extend(chunk)
+            if progress and start + SEARCH_CHUNK < len(candidates):
+                top = heapq.nsmallest(SEARCH_PARTIAL, top + chunk)
+                progress([i for _, i in top])
+        scored.sort()
+        return self._remember(query, [i for _, i in scored], version)
+
+    def _search_shards(self, store, candidates, terms, qmask, cancelled, progress):
+        """由进程池分片并行打分并合并结果，取消时返回 None"""
+        size = -(-len(candidates) // (SHARD_WORKERS * 2))
+        pool = shard_pool()
+        futures = [pool.submit(score_shard, store.name, candidates[start:start + size],
+                               terms, qmask)
+                   for start in range(0, len(candidates), size)]
+        parts = []
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=SEARCH_POLL, return_when=FIRST_COMPLETED)
+            if cancelled and cancelled():
+                for future in pending:
+                    future.cancel()
+                return None
+            parts.extend(future.result() for future in done)
+            if progress and done and pending:
+                progress([i for _, i in itertools.islice(heapq.merge(*parts), SEARCH_PARTIAL)])
+        return [i for _, i in heapq.merge(*parts)]
+
+    def _remember(self, query, result, version):
+        """缓存查询结果（项目列表已变化时不缓存）"""
+        with self.lock:
+            if self.version == version:
+                self.cache[query.key] = (query, result)
+                if len(self.cache) > SEARCH_CACHE_SIZE:
+                    self.cache.popitem(last=False)
+        return result
+
+
+class SearchWorker:
+    """后台搜索线程：新的查询取消进行中的查询，分批回报部分结果"""
+
+    def __init__(self):
+        self.generation = 0           # 最新查询的编号，编号变化即取消旧查询
+        self.requests = queue.Queue()
+        self.results = queue.Queue()  # (编号, 查询, 结果, 是否完成)
+        self.pending = False          # 最新的查询是否还未完成
+        self.thread = None
+
+    def submit(self, index, query):
+        """提交查询（取消进行中的查询）"""
+        self.generation += 1
+        self.pending = True
+        self.requests.put((self.generation, index, query))
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._worker, daemon=True)
+            self.thread.start()
+
+    def cancel(self):
+        """取消进行中的查询"""
+        self.generation += 1
+        self.pending = False
+
+    def _worker(self):
+        while True:
+            generation, index, query = self.requests.get()
+            if generation != self.generation:
+                continue  # 已被更新的查询取代
+            cancelled = lambda: generation != self.generation
+            progress = lambda partial: self.results.put((generation, query, partial, False))
+            result = index.search(query, cancelled, progress)
+            if result is not None:
+                self.results.put((generation, query, result, True))
+
+    def busy(self):
+        """最新的查询是否还未完成"""
+        return self.pending
+
+    def poll(self):
+        """取出最新查询的结果: (查询, 结果, 是否完成)，没有新结果时返回 None"""
+        latest = None
+        while True:
+            try:
+                generation, query, result, done = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self.generation:
+                latest = (query, result, done)
+        if latest is not None and latest[2]:
+            self.pending = False
+        return latest
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # 终端控制
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -543,11 +2492,20 @@ class Terminal:
         self.kernel32 = None
         self.in_handle = None
         self.old_input_mode = None
+        self.frame = []         # 上一帧各行内容（用于差量重绘）
+        self.frame_size = None  # 上一帧的终端尺寸
+        self.resize_events = False  # 窗口大小变化是否以 'RESIZE' 事件通知
+        self.resize_r = None        # SIGWINCH 自管道
+        self.resize_w = None
+        self.old_winch = None
         if not self.is_windows_native:
             self.fd = sys.stdin.fileno()
+            self.inbuf = ''  # 已读取未处理的输入
+            self.decoder = codecs.getincrementaldecoder('utf-8')('replace') if HAS_UNIX_TERMINAL else None
 
     def start(self):
         """进入原始模式"""
+        self.invalidate()
         if self.is_windows_native:
             # Windows 原生模式 - 启用虚拟终端序列和鼠标事件
             if sys.platform == 'win32':
@@ -583,6 +2541,7 @@ class Terminal:
                     new_mode |= ENABLE_MOUSE_INPUT | ENABLE_EXTENDED_FLAGS | ENABLE_WINDOW_INPUT
                     new_mode &= ~ENABLE_QUICK_EDIT_MODE  # 禁用快速编辑
                     self.kernel32.SetConsoleMode(self.in_handle, new_mode)
+                    self.resize_events = True  # ENABLE_WINDOW_INPUT 产生窗口大小事件
                 except:
                     pass
             # 备用屏幕 + 隐藏光标 + 启用鼠标追踪
@@ -591,6 +2550,7 @@ class Terminal:
         elif HAS_UNIX_TERMINAL:
             self.old = termios.tcgetattr(self.fd)
             tty.setraw(self.fd)
+            self._watch_resize()
             # 备用屏幕 + 隐藏光标 + 启用鼠标追踪 (SGR模式)
             sys.stdout.write('\033[?1049h\033[?25l\033[?1000h\033[?1006h')
             sys.stdout.flush()
@@ -608,6 +2568,12 @@ class Terminal:
         """恢复终端"""
         if self.old and HAS_UNIX_TERMINAL:
             termios.tcsetattr(self.fd, termios.TCSADRAIN, self.old)
+        if self.resize_r is not None:
+            signal.signal(signal.SIGWINCH, self.old_winch or signal.SIG_DFL)
+            os.close(self.resize_r)
+            os.close(self.resize_w)
+            self.resize_r = self.resize_w = None
+            self.resize_events = False
         # Windows: 恢复输入模式
         if self.kernel32 and self.in_handle and self.old_input_mode is not None:
             self.kernel32.SetConsoleMode(self.in_handle, self.old_input_mode)
@@ -616,19 +2582,71 @@ class Terminal:
         sys.stdout.flush()
 
     def size(self):
-        """获取尺寸"""
+        """查询终端尺寸（窗口大小改变时调用，绘制时使用 rows/cols）"""
         sz = shutil.get_terminal_size()
         self.rows, self.cols = sz.lines, sz.columns
         return self.rows, self.cols
 
-    def read_key(self):
-        """读取按键 - 跨平台"""
+    def read_key(self, timeout=None, wake_fds=()):
+        """读取按键 - 跨平台
+
+        timeout 为秒数时，超时无输入返回 None（用于处理后台任务结果）；
+        wake_fds 中的描述符可读时同样提前返回 None（仅 Unix）；
+        窗口大小改变时返回 'RESIZE'
+        """
         if self.is_windows_native:
-            return self._read_key_windows()
-        else:
-            return self._read_key_unix()
+            return self._read_key_windows(timeout)
+        if self._take_resize():
+            return 'RESIZE'
+        if self.resize_r is not None:
+            wake_fds = (*wake_fds, self.resize_r)
+        if (timeout is not None or wake_fds) and not self._input_ready(timeout, wake_fds):
+            return 'RESIZE' if self._take_resize() else None
+        return self._read_key_unix()
+
+    def _watch_resize(self):
+        """通过 SIGWINCH 和自管道把窗口大小变化转为输入事件（仅 Unix）"""
+        if not hasattr(signal, 'SIGWINCH') or threading.current_thread() is not threading.main_thread():
+            return
+        self.resize_r, self.resize_w = os.pipe()
+        os.set_blocking(self.resize_r, False)
+        os.set_blocking(self.resize_w, False)
+        self.old_winch = signal.signal(signal.SIGWINCH, self._on_resize)
+        self.resize_events = True
 
-    def _read_key_windows(self):
+    def _on_resize(self, signum, frame):
+        try:
+            os.write(self.resize_w, b'\0')
+        except OSError:
+            pass  # 管道已满，已有未处理的事件
+
+    def _take_resize(self):
+        """取出未处理的窗口大小变化事件（多次变化合并为一次）"""
+        if self.resize_r is None:
+            return False
+        try:
+            return bool(os.read(self.resize_r, 4096))
+        except BlockingIOError:
+            return False
+
+    def _input_ready(self, timeout, wake_fds=()):
+        """等待输入可读，最多等待 timeout 秒"""
+        if self.is_windows_native:
+            if self.kernel32 and self.in_handle:
+                WAIT_OBJECT_0 = 0
+                ms = max(0, int(timeout * 1000))
+                return self.kernel32.WaitForSingleObject(self.in_handle, ms) == WAIT_OBJECT_0
+            deadline = time.monotonic() + timeout
+            while not msvcrt.kbhit():
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.01)
+            return True
+        if self.inbuf:
+            return True
+        return self.fd in select.select([self.fd, *wake_fds], [], [], timeout)[0]
+
+    def _read_key_windows(self, timeout=None):
         """Windows 原生按键读取 (使用 Windows Console API)"""
         import ctypes
 
@@ -670,6 +2688,7 @@ class Terminal:
 
             KEY_EVENT = 0x0001
             MOUSE_EVENT = 0x0002
+            WINDOW_BUFFER_SIZE_EVENT = 0x0004
             FROM_LEFT_1ST_BUTTON_PRESSED = 0x0001
             MOUSE_WHEELED = 0x0004
 
@@ -678,6 +2697,8 @@ class Terminal:
 
             # 持续读取直到获得有效输入
             while True:
+                if timeout is not None and not self._input_ready(timeout):
+                    return None
                 result = self.kernel32.ReadConsoleInputW(
                     self.in_handle, ctypes.byref(ir), 1, ctypes.byref(num_read)
                 )
@@ -739,11 +2760,16 @@ class Terminal:
                     # 忽略其他鼠标事件（移动、释放等）
                     continue
 
+                elif ir.EventType == WINDOW_BUFFER_SIZE_EVENT:
+                    return 'RESIZE'
+
                 else:
-                    # 忽略其他事件类型（窗口大小变化等）
+                    # 忽略其他事件类型（焦点、菜单等）
                     continue
 
         # 降级使用 msvcrt（没有鼠标支持）
+        if timeout is not None and not self._input_ready(timeout):
+            return None
         ch = msvcrt.getwch()
 
         # 特殊键前缀
@@ -765,7 +2791,6 @@ class Terminal:
         # ESC 键
         if ch == '\x1b':
             # 检查是否有后续字符 (ANSI 序列)
-            import time
             time.sleep(0.01)  # 短暂等待
             if msvcrt.kbhit():
                 buf = ''
@@ -805,67 +2830,72 @@ class Terminal:
 
         return ch
 
-    def _read_key_unix(self):
-        """Unix 系统按键读取 (使用 termios/fcntl)"""
-        ch = sys.stdin.read(1)
-
-        if ch == '\x1b':
-            # 设置非阻塞模式读取后续字符
-            old_flags = fcntl.fcntl(self.fd, fcntl.F_GETFL)
-            fcntl.fcntl(self.fd, fcntl.F_SETFL, old_flags | os.O_NONBLOCK)
-
-            try:
-                # 尝试读取更多字符
-                buf = ''
-                try:
-                    buf = sys.stdin.read(64)  # 增大缓冲区以处理鼠标事件
-                except (IOError, BlockingIOError):
-                    pass
-
-                if not buf:
-                    return 'ESC'
-
-                # 解析 ESC 序列
-                if buf.startswith('['):
-                    seq = buf[1:]
+    def _getch(self):
+        """从输入缓冲区取一个字符，缓冲区为空时阻塞读取"""
+        while not self.inbuf:
+            data = os.read(self.fd, 1024)
+            if not data:
+                return '\x04'  # 输入已关闭，按 Ctrl+D 处理
+            self.inbuf += self.decoder.decode(data)
+        ch = self.inbuf[0]
+        self.inbuf = self.inbuf[1:]
+        return ch
 
-                    # SGR 鼠标事件: \x1b[<Btn;X;YM 或 \x1b[<Btn;X;Ym
-                    if seq.startswith('<'):
-                        return self._parse_mouse_sgr(seq[1:])
+    def _take_pending(self):
+        """取出缓冲区及终端中已到达的全部字符（不阻塞）"""
+        if select.select([self.fd], [], [], 0)[0]:
+            data = os.read(self.fd, 1024)
+            self.inbuf += self.decoder.decode(data)
+        buf, self.inbuf = self.inbuf, ''
+        return buf
 
-                    # 方向键等
-                    if seq.startswith('A') or seq == 'A': return 'UP'
-                    if seq.startswith('B') or seq == 'B': return 'DOWN'
-                    if seq.startswith('C') or seq == 'C': return 'RIGHT'
-                    if seq.startswith('D') or seq == 'D': return 'LEFT'
-                    if seq.startswith('H') or seq == 'H': return 'HOME'
-                    if seq.startswith('F') or seq == 'F': return 'END'
-                    if seq.startswith('5~'): return 'PGUP'
-                    if seq.startswith('6~'): return 'PGDN'
-                    if seq.startswith('1~') or seq.startswith('7~'): return 'HOME'
-                    if seq.startswith('4~') or seq.startswith('8~'): return 'END'
-                    # 带修饰键的方向键 (如 1;5A)
-                    if 'A' in seq: return 'UP'
-                    if 'B' in seq: return 'DOWN'
-                    if 'C' in seq: return 'RIGHT'
-                    if 'D' in seq: return 'LEFT'
-                    return None
+    def _read_key_unix(self):
+        """Unix 系统按键读取 (使用 termios/select)"""
+        ch = self._getch()
 
-                elif buf.startswith('O'):
-                    seq = buf[1:2] if len(buf) > 1 else ''
-                    if seq == 'A': return 'UP'
-                    if seq == 'B': return 'DOWN'
-                    if seq == 'C': return 'RIGHT'
-                    if seq == 'D': return 'LEFT'
-                    if seq == 'H': return 'HOME'
-                    if seq == 'F': return 'END'
-                    return None
+        if ch == '\x1b':
+            # 读取已到达的后续字符 (整块读取以处理鼠标事件)
+            buf = self._take_pending()
+            if not buf:
+                return 'ESC'
+
+            # 解析 ESC 序列
+            if buf.startswith('['):
+                seq = buf[1:]
+
+                # SGR 鼠标事件: \x1b[<Btn;X;YM 或 \x1b[<Btn;X;Ym
+                if seq.startswith('<'):
+                    return self._parse_mouse_sgr(seq[1:])
+
+                # 方向键等
+                if seq.startswith('A') or seq == 'A': return 'UP'
+                if seq.startswith('B') or seq == 'B': return 'DOWN'
+                if seq.startswith('C') or seq == 'C': return 'RIGHT'
+                if seq.startswith('D') or seq == 'D': return 'LEFT'
+                if seq.startswith('H') or seq == 'H': return 'HOME'
+                if seq.startswith('F') or seq == 'F': return 'END'
+                if seq.startswith('5~'): return 'PGUP'
+                if seq.startswith('6~'): return 'PGDN'
+                if seq.startswith('1~') or seq.startswith('7~'): return 'HOME'
+                if seq.startswith('4~') or seq.startswith('8~'): return 'END'
+                # 带修饰键的方向键 (如 1;5A)
+                if 'A' in seq: return 'UP'
+                if 'B' in seq: return 'DOWN'
+                if 'C' in seq: return 'RIGHT'
+                if 'D' in seq: return 'LEFT'
+                return None
 
+            elif buf.startswith('O'):
+                seq = buf[1:2] if len(buf) > 1 else ''
+                if seq == 'A': return 'UP'
+                if seq == 'B': return 'DOWN'
+                if seq == 'C': return 'RIGHT'
+                if seq == 'D': return 'LEFT'
+                if seq == 'H': return 'HOME'
+                if seq == 'F': return 'END'
                 return None
 
-            finally:
-                # 恢复阻塞模式
-                fcntl.fcntl(self.fd, fcntl.F_SETFL, old_flags)
+            return None
 
         if ch == '\r' or ch == '\n': return 'ENTER'
         if ch == '\t': return 'TAB'
@@ -909,23 +2939,105 @@ class Terminal:
         except:
             return None
 
-    def goto(self, row, col):
-        sys.stdout.write(f'\033[{row};{col}H')
-
-    def clear_line(self):
-        sys.stdout.write('\033[K')
-
-    def write(self, s):
-        sys.stdout.write(s)
-
-    def flush(self):
+    def invalidate(self):
+        """丢弃上一帧，下次输出整屏重绘"""
+        self.frame = []
+        self.frame_size = None
+
+    def render(self, lines):
+        """输出一帧：与上一帧逐行比较，只重绘变化的行，合并为一次写入
+
+        lines 应覆盖整个屏幕（不足的行用空串填充）；尺寸变化时整屏重绘。
+        """
+        size = (self.rows, self.cols)
+        if size != self.frame_size or len(self.frame) != len(lines):
+            self.frame = [None] * len(lines)
+            self.frame_size = size
+        out = []
+        for i, line in enumerate(lines):
+            if self.frame[i] != line:
+                out.append(f'\033[{i + 1};1H\033[K{line}')
+                self.frame[i] = line
+        if out:
+            self._emit(''.join(out))
+
+    def _emit(self, s):
+        """一次性写出到终端"""
+        if self.is_windows_native:
+            # 控制台编码由 sys.stdout 处理
+            sys.stdout.write(s)
+            sys.stdout.flush()
+            return
         sys.stdout.flush()
+        data = s.encode(sys.stdout.encoding or 'utf-8', 'replace')
+        fd = sys.stdout.fileno()
+        while data:
+            data = data[os.write(fd, data):]
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 主程序
 # ═══════════════════════════════════════════════════════════════════════════════
 
+POLL_INTERVAL = 0.1  # 有后台任务时的界面刷新间隔（秒）
+ROW_CACHE_SIZE = 4096  # 缓存渲染结果的项目数上限
+
+
+class Source:
+    """一个编辑器的最近打开列表：数据库、读取器、操作日志和监视器"""
+
+    def __init__(self, name, db_path):
+        self.name = name
+        self.db_path = db_path
+        self.vscode = None           # 打开该来源项目使用的命令
+        self.projects = []           # 该来源的项目记录（按最近打开顺序）
+        self.digest = None           # 已加载列表的内容哈希
+        self.loaded = False
+        self.reader = SnapshotReader(db_path)
+        self.journal = OpJournal(cache_file('journal', db_path, '.jsonl'))
+        self.watcher = None
+
+    def refresh(self):
+        """重新读取列表，有变化时返回 True（未变化的记录复用原对象）"""
+        if not self.reader.poll() and self.loaded:
+            return False
+        try:
+            digest, projects = load_records(self.db_path, self.reader, self.projects)
+        except Exception:
+            return False
+        if self.loaded and digest == self.digest:
+            return False
+        self.loaded = True
+        self.digest = digest
+        self.projects = projects
+        return True
+
+    def begin_flush(self):
+        """取出待写入的操作并标记为写入中，返回 (操作列表, 写入函数)；没有操作时返回 None
+
+        写入函数只使用此刻的快照，可在后台线程中调用，结果交给 end_flush 处理。
+        """
+        if not self.journal.ops:
+            self.journal.clear()  # 操作都已被撤销，日志中只剩删除/取消记录
+            return None
+        ops = list(self.journal.ops)
+        self.journal.committing = {op['id'] for op in ops}
+        return ops, functools.partial(commit_history, self.db_path, ops, self.digest)
+
+    def end_flush(self, ops, result):
+        """写入完成：成功时从日志中移除已提交的操作"""
+        self.journal.committing = set()
+        if result['ok']:
+            # 合并了其他程序的修改时，已加载的列表不是写入后的内容，下次刷新须重新读取
+            self.digest = None if result['merged'] else result['digest']
+            self.journal.commit({op['id'] for op in ops})
+
+    def close(self):
+        self.reader.close()
+        if self.watcher:
+            self.watcher.close()
+
+
 class App:
     """项目管理器"""
 
@@ -933,31 +3045,52 @@ class App:
         self.term = Terminal()
         self.projects = []
         self.visible = []       # 过滤后的索引
+        self.index = ProjectIndex([])  # 搜索索引
+        self.searcher = SearchWorker()  # 后台搜索
         self.selected = set()   # 多选的索引
         self.query = ''         # 搜索词
         self.cursor = 0         # 当前光标
         self.scroll = 0         # 滚动偏移
         self.list_height = 10   # 列表高度
-        self.db_path = ''
+        self.rows = self.cols = None  # 当前布局对应的终端尺寸
+        self.name_w = self.path_w = 0  # 名称列和路径列宽度
+        self.sources = []            # 各编辑器的来源
         self.vscode = ''
         self.running = True
         self.message = ''       # 底部消息
         self.search_mode = False
-        self.last_deleted = []  # 最近删除的项目（用于撤销）
+        self.undo_stack = []         # 删除记录栈（用于多级撤销）
+        self.journal_due = None      # 操作日志的写入时间
+        self.writer = ThreadPoolExecutor(max_workers=1)  # 后台写入数据库
+        self.writing = None          # 进行中的写入 (future, [(来源, 操作列表)])
+        self.deferred_undo = []      # 撤销时删除正在写入的 (来源名称, 撤销信息)，写入完成后处理
+        self.reload_due = False      # 监视到数据库变化，待写入完成后重新加载
         self.confirm_delete = False  # 删除确认模式
-        self.pending_delete = []     # 待删除的索引
-
-    def filter(self):
-        """过滤项目"""
-        if not self.query:
-            self.visible = list(range(len(self.projects)))
-        else:
-            q = self.query.lower()
-            self.visible = [
-                i for i, p in enumerate(self.projects)
-                if q in p['name'].lower() or q in p['path'].lower()
-            ]
+        self.pending_delete = []     # 待删除项目的 URI
+        self.prober = ExistenceProber()  # 后台存在性检测
+        self.exists_cache = ExistsCache()
+        self.probing = {}            # 检测中的路径 -> 项目列表
+        self.launcher = Launcher()   # 后台启动编辑器和文件管理器
+        self.usage = UsageStore()    # 打开记录
+        self.frecency = {}           # URI -> 常用程度得分
+        self.row_cache = {}          # URI -> {(光标, 选中, 存在状态, 名称宽, 路径宽): 渲染好的行}
+
+    def filter(self, wait=False):
+        """过滤项目
+
+        项目较多且查询结果未缓存时在后台搜索（wait 为 True 时除外），
+        结果在 tick 中回填，搜索期间先显示已得到的最佳匹配。
+        """
+        result = self.index.lookup(self.query)
+        if result is None and not wait and len(self.projects) >= SEARCH_ASYNC_MIN:
+            self.searcher.submit(self.index, self.query)
+            return
+        self.searcher.cancel()
+        self.visible = result if result is not None else self.index.search(self.query)
+        self.fix_cursor()
 
+    def fix_cursor(self):
+        """修正光标和滚动位置"""
         # 修正光标
         if self.cursor >= len(self.visible):
             self.cursor = max(0, len(self.visible) - 1)
@@ -968,13 +3101,32 @@ class App:
         elif self.cursor >= self.scroll + self.list_height:
             self.scroll = self.cursor - self.list_height + 1
 
-    def draw(self):
-        """绘制界面"""
+    def relayout(self):
+        """重新计算布局（启动和窗口大小改变时），尺寸变化时丢弃渲染缓存并整屏重绘"""
         rows, cols = self.term.size()
+        if (rows, cols) == (self.rows, self.cols):
+            return
+        self.rows, self.cols = rows, cols
         self.list_height = rows - 8  # 留更多空间给帮助栏
         if self.list_height < 3:
             self.list_height = 3
 
+        # 布局计算 - 给名称更多空间
+        self.name_w = min(45, max(25, cols * 40 // 100))
+        self.path_w = cols - self.name_w - 14  # 减少前缀占用
+        if self.path_w < 15:
+            self.path_w = 15
+
+        self.row_cache.clear()
+        self.term.invalidate()
+
+    def draw(self):
+        """绘制界面"""
+        if not self.term.resize_events:
+            self.relayout()  # 无法得到窗口大小事件时每帧检查
+        rows, cols = self.rows, self.cols
+        name_w, path_w = self.name_w, self.path_w
+
         # 确保滚动范围正确（处理尺寸变化）
         if self.visible:
             if self.cursor >= len(self.visible):
@@ -987,11 +3139,7 @@ class App:
             if self.scroll > max_scroll:
                 self.scroll = max_scroll
 
-        # 布局计算 - 给名称更多空间
-        name_w = min(45, max(25, cols * 40 // 100))
-        path_w = cols - name_w - 14  # 减少前缀占用
-        if path_w < 15:
-            path_w = 15
+        primary = self.sources[0].name if self.sources else None  # 主来源的项目不显示来源名称
 
         lines = []
 
@@ -1000,6 +3148,8 @@ class App:
         # ─────────────────────────────────────────────────
         total = len(self.visible)
         pos_info = f'{C.GRAY}{self.cursor + 1}/{total}{C.RST}' if total > 0 else ''
+        if self.searcher.busy():
+            pos_info += f' {C.GRAY}搜索中…{C.RST}'
         sel_info = f'{C.LGREEN}[{len(self.selected)} 已选]{C.RST} ' if self.selected else ''
         title = f'{C.BOLD}{C.LCYAN} 📂 VSCode Projects{C.RST}  {sel_info}{pos_info}'
         lines.append(title)
@@ -1026,94 +3176,17 @@ class App:
         total = len(self.visible)
         end = min(self.scroll + self.list_height, total)
 
+        # 缓存过多时丢弃全部渲染结果（窗口大小改变时由 relayout 丢弃）
+        if len(self.row_cache) > ROW_CACHE_SIZE:
+            self.row_cache.clear()
         for i in range(self.scroll, end):
             idx = self.visible[i]
             p = self.projects[idx]
-            is_cur = (i == self.cursor)
-            is_sel = (idx in self.selected)
-            is_invalid = not p.get('exists', True)  # 失效项目
-
-            # 选择指示器
-            if is_sel:
-                marker = f'{C.LGREEN}[✓]{C.RST}'
-            else:
-                marker = f'{C.GRAY}[ ]{C.RST}'
-
-            # 光标指示器
-            if is_cur:
-                pointer = f'{C.LCYAN}❯{C.RST}'
-            else:
-                pointer = ' '
-
-            # 图标 - 失效项目使用灰色图标
-            if is_invalid:
-                if p['type'] == 'folder':
-                    icon = f'{C.GRAY}📁{C.RST}'
-                elif p['type'] == 'file':
-                    icon = f'{C.GRAY}📄{C.RST}'
-                else:
-                    icon = f'{C.GRAY}📦{C.RST}'
-            elif p['type'] == 'folder':
-                icon = f'{C.LYELLOW}📁{C.RST}'
-            elif p['type'] == 'file':
-                icon = f'{C.LBLUE}📄{C.RST}'
-            else:
-                icon = f'{C.LMAGENTA}📦{C.RST}'
-
-            # 名称（不包含颜色代码）
-            name = p['name']
-            tag_str = ''
-            if p['tag']:
-                tag_str = f" [{p['tag']}]"
-                name = name + tag_str
-
-            # 失效项目添加标记
-            if is_invalid:
-                name = name + ' [无效]'
-
-            name_display = str_cut(name, name_w)
-            name_padded = str_pad(name_display, name_w)
-
-            # 路径 - 有转换路径时优先显示转换路径
-            show_path = p['path']
-            if p.get('display_path'):
-                show_path = os.path.dirname(p['display_path']) or '/'
-            path_display = str_cut(show_path, path_w)
-            path_padded = str_pad(path_display, path_w)
-
-            # 组装行
-            if is_invalid:
-                # 失效项目 - 暗淡灰色样式
-                name_colored = f'{C.DIM}{C.GRAY}{name_padded}{C.RST}'
-                path_colored = f'{C.DIM}{C.GRAY}{path_padded}{C.RST}'
-                line = f' {pointer} {marker} {icon} {name_colored} {path_colored}'
-            elif is_cur:
-                # 高亮当前行
-                if p['tag']:
-                    tag_start = name_padded.find('[')
-                    if tag_start >= 0:
-                        name_before = name_padded[:tag_start]
-                        name_after = name_padded[tag_start:]
-                        name_colored = f'{C.BOLD}{C.WHITE}{name_before}{C.LCYAN}{name_after}{C.RST}'
-                    else:
-                        name_colored = f'{C.BOLD}{C.WHITE}{name_padded}{C.RST}'
-                else:
-                    name_colored = f'{C.BOLD}{C.WHITE}{name_padded}{C.RST}'
-                line = f' {pointer} {marker} {icon} {name_colored} {C.GRAY}{path_padded}{C.RST}'
-            else:
-                # 普通行
-                if p['tag']:
-                    tag_start = name_padded.find('[')
-                    if tag_start >= 0:
-                        name_before = name_padded[:tag_start]
-                        name_after = name_padded[tag_start:]
-                        name_colored = f'{C.WHITE}{name_before}{C.CYAN}{name_after}{C.RST}'
-                    else:
-                        name_colored = f'{C.WHITE}{name_padded}{C.RST}'
-                else:
-                    name_colored = f'{C.WHITE}{name_padded}{C.RST}'
-                line = f' {pointer} {marker} {icon} {name_colored} {C.DIM}{path_padded}{C.RST}'
-
+            key = (i == self.cursor, idx in self.selected, p.get('exists', True), name_w, path_w)
+            rows_of = self.row_cache.setdefault(p['uri'], {})
+            line = rows_of.get(key)
+            if line is None:
+                line = rows_of[key] = self.render_row(p, *key[:2], name_w, path_w, primary)
             lines.append(line)
 
         # 填充空行
@@ -1132,7 +3205,8 @@ class App:
             if self.visible:
                 idx = self.visible[self.cursor]
                 p = self.projects[idx]
-                is_invalid = not p.get('exists', True)
+                is_invalid = p.get('exists', True) is False
+                is_unknown = p.get('exists', True) is None
 
                 # 有转换路径时显示转换后的路径
                 if p.get('display_path'):
@@ -1144,6 +3218,9 @@ class App:
                 if is_invalid:
                     show_full = p.get('display_path') or p['full_path']
                     lines.append(f' {C.LYELLOW}⚠️  路径不存在:{C.RST} {C.DIM}{show_full}{C.RST}')
+                elif is_unknown:
+                    state = '检测中' if p['check_path'] in self.probing else '检测超时'
+                    lines.append(f' {C.DIM}路径 ({state}):{C.RST} {info}')
                 else:
                     lines.append(f' {C.DIM}路径:{C.RST} {info}')
             else:
@@ -1167,14 +3244,14 @@ class App:
                 opn = f'{C.LYELLOW}Enter{C.RST}当前窗口 {C.LYELLOW}n{C.RST}新窗口 {C.LYELLOW}w{C.RST}工作区'
                 tool = f'{C.LYELLOW}y{C.RST}复制路径 {C.LYELLOW}o{C.RST}资源管理器'
                 # 有可撤销内容时显示 u 撤销
-                if self.last_deleted:
+                if self.undo_stack:
                     mng = f'{C.LYELLOW}d{C.RST}删除 {C.LGREEN}u{C.RST}撤销 {C.LYELLOW}/{C.RST}搜索 {C.LYELLOW}q{C.RST}退出'
                 else:
                     mng = f'{C.LYELLOW}d{C.RST}删除 {C.LYELLOW}/{C.RST}搜索 {C.LYELLOW}q{C.RST}退出'
                 help_line = f' {nav} {C.GRAY}│{C.RST} {sel} {C.GRAY}│{C.RST} {opn} {C.GRAY}│{C.RST} {tool} {C.GRAY}│{C.RST} {mng}'
             else:
                 # 窄屏简化显示
-                if self.last_deleted:
+                if self.undo_stack:
                     help_line = f' {C.LYELLOW}↑↓{C.RST}导航 {C.LYELLOW}Enter{C.RST}打开 {C.LYELLOW}Space{C.RST}选择 {C.LYELLOW}d{C.RST}删除 {C.LGREEN}u{C.RST}撤销 {C.LYELLOW}q{C.RST}退出'
                 else:
                     help_line = f' {C.LYELLOW}↑↓{C.RST}导航 {C.LYELLOW}Enter{C.RST}打开 {C.LYELLOW}n{C.RST}新窗口 {C.LYELLOW}Space{C.RST}选择 {C.LYELLOW}/{C.RST}搜索 {C.LYELLOW}q{C.RST}退出'
@@ -1182,24 +3259,113 @@ class App:
         lines.append(help_line)
 
         # ─────────────────────────────────────────────────
-        # 输出
+        # 输出（只重绘与上一帧不同的行，多余行清空）
         # ─────────────────────────────────────────────────
-        for i, line in enumerate(lines):
-            self.term.goto(i + 1, 1)
-            self.term.clear_line()
-            self.term.write(line)
+        lines.extend([''] * (rows - len(lines)))
+        self.term.render(lines[:rows])
+
+    def render_row(self, p, is_cur, is_sel, name_w, path_w, primary):
+        """渲染列表中的一行"""
+        is_invalid = p.get('exists', True) is False  # 失效项目
+        is_unknown = p.get('exists', True) is None   # 尚未检测完成或检测超时
+
+        # 选择指示器
+        if is_sel:
+            marker = f'{C.LGREEN}[✓]{C.RST}'
+        else:
+            marker = f'{C.GRAY}[ ]{C.RST}'
+
+        # 光标指示器
+        if is_cur:
+            pointer = f'{C.LCYAN}❯{C.RST}'
+        else:
+            pointer = ' '
+
+        # 图标 - 失效项目使用灰色图标
+        if is_invalid:
+            if p['type'] == 'folder':
+                icon = f'{C.GRAY}📁{C.RST}'
+            elif p['type'] == 'file':
+                icon = f'{C.GRAY}📄{C.RST}'
+            else:
+                icon = f'{C.GRAY}📦{C.RST}'
+        elif p['type'] == 'folder':
+            icon = f'{C.LYELLOW}📁{C.RST}'
+        elif p['type'] == 'file':
+            icon = f'{C.LBLUE}📄{C.RST}'
+        else:
+            icon = f'{C.LMAGENTA}📦{C.RST}'
+
+        # 名称（不包含颜色代码）
+        name = p['name']
+        tag = project_tag(p, primary)
+        if tag:
+            name = name + f' [{tag}]'
+
+        # 失效项目添加标记
+        if is_invalid:
+            name = name + ' [无效]'
+        elif is_unknown:
+            name = name + ' [?]'
+
+        name_display = str_cut(name, name_w)
+        name_padded = str_pad(name_display, name_w)
+
+        # 路径 - 有转换路径时优先显示转换路径
+        show_path = p['path']
+        if p.get('display_path'):
+            show_path = os.path.dirname(p['display_path']) or '/'
+        path_display = str_cut(show_path, path_w)
+        path_padded = str_pad(path_display, path_w)
+
+        # 组装行
+        if is_invalid:
+            # 失效项目 - 暗淡灰色样式
+            name_colored = f'{C.DIM}{C.GRAY}{name_padded}{C.RST}'
+            path_colored = f'{C.DIM}{C.GRAY}{path_padded}{C.RST}'
+            line = f' {pointer} {marker} {icon} {name_colored} {path_colored}'
+        elif is_cur:
+            # 高亮当前行
+            if tag:
+                tag_start = name_padded.find('[')
+                if tag_start >= 0:
+                    name_before = name_padded[:tag_start]
+                    name_after = name_padded[tag_start:]
+                    name_colored = f'{C.BOLD}{C.WHITE}{name_before}{C.LCYAN}{name_after}{C.RST}'
+                else:
+                    name_colored = f'{C.BOLD}{C.WHITE}{name_padded}{C.RST}'
+            else:
+                name_colored = f'{C.BOLD}{C.WHITE}{name_padded}{C.RST}'
+            line = f' {pointer} {marker} {icon} {name_colored} {C.GRAY}{path_padded}{C.RST}'
+        else:
+            # 普通行
+            if tag:
+                tag_start = name_padded.find('[')
+                if tag_start >= 0:
+                    name_before = name_padded[:tag_start]
+                    name_after = name_padded[tag_start:]
+                    name_colored = f'{C.WHITE}{name_before}{C.CYAN}{name_after}{C.RST}'
+                else:
+                    name_colored = f'{C.WHITE}{name_padded}{C.RST}'
+            else:
+                name_colored = f'{C.WHITE}{name_padded}{C.RST}'
+            line = f' {pointer} {marker} {icon} {name_colored} {C.DIM}{path_padded}{C.RST}'
 
-        # 清除多余行
-        for i in range(len(lines), rows):
-            self.term.goto(i + 1, 1)
-            self.term.clear_line()
+        return line
 
-        self.term.flush()
+    def vscode_for(self, p):
+        """打开项目使用的命令：项目所属来源的编辑器"""
+        for source in self.sources:
+            if source.name == p.get('source'):
+                return source.vscode
+        return self.vscode
 
     def open_projects(self, indices, new_window=False, as_workspace=False):
         """打开项目"""
         if not indices:
             return
+        # 更新常用程度得分（列表顺序在下次刷新时调整，避免光标下的项目突然移动）
+        self.frecency.update(self.usage.record([self.projects[idx]['uri'] for idx in indices]))
 
         if as_workspace and len(indices) > 1:
             # 作为工作区打开
@@ -1211,125 +3377,321 @@ class App:
                     path = unquote(parsed.path)
                     if len(path) > 2 and path[0] == '/' and path[2] == ':':
                         path = path[1:]
-                    folders.append({'path': path})
+                    folders.append(path)
 
-            if folders:
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.code-workspace', delete=False) as f:
-                    json.dump({'folders': folders}, f)
-                    ws_path = f.name
+            ws_path = workspace_file(folders) if folders else None
+            if ws_path:
                 # Windows 上需要 shell=True 来执行 .cmd 文件
-                shell = IS_WINDOWS and self.vscode.endswith('.cmd')
-                subprocess.Popen([self.vscode, ws_path],
-                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-                                shell=shell)
+                vscode = self.vscode_for(self.projects[indices[0]])
+                shell = IS_WINDOWS and vscode.endswith('.cmd')
+                names = [self.projects[idx]['name'] for idx in indices]
+                self.launcher.submit_command(names, [vscode, ws_path], shell=shell, detach=True)
         else:
-            # 逐个打开
-            for i, idx in enumerate(indices):
+            # 按编辑器分组，每组每批只调用一次命令（或通过 IPC 套接字发送一次请求）
+            groups = {}
+            for idx in indices:
                 p = self.projects[idx]
-                uri = p['uri']
-
-                if uri.startswith('vscode-remote://'):
-                    args = [self.vscode, '--folder-uri', uri]
-                    if new_window or i > 0:
-                        args.insert(1, '--new-window')
-                else:
-                    parsed = urlparse(uri)
-                    path = unquote(parsed.path)
-                    if len(path) > 2 and path[0] == '/' and path[2] == ':':
-                        path = path[1:]
-
-                    args = [self.vscode]
-                    if new_window or i > 0:
-                        args.append('-n')
-                    else:
-                        args.append('-r')
-                    args.append(path)
-
-                # Windows 上需要 shell=True 来执行 .cmd 文件
-                shell = IS_WINDOWS and self.vscode.endswith('.cmd')
-                subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-                                shell=shell)
-
-    def _do_delete(self, indices):
-        """执行删除操作"""
-        if not indices:
+                groups.setdefault(self.vscode_for(p), []).append(p)
+
+            hook = ipc_hook()
+            primary = self.sources[0].vscode if self.sources else self.vscode
+            for vscode, projects in groups.items():
+                for force_new, batch in launch_batches(projects, new_window):
+                    # IPC 套接字属于当前终端所在的编辑器，只用于主来源的项目
+                    use_ipc = hook if vscode == primary else None
+                    self.launcher.submit([p['name'] for p in batch],
+                                         functools.partial(self._launch, vscode, batch,
+                                                           force_new, use_ipc))
+
+    def _launch(self, vscode, batch, new_window, hook=None):
+        """打开一批项目（在启动线程中执行），返回错误信息或 None"""
+        if hook and ipc_open(hook, batch, new_window):
+            return None
+        # Windows 上需要 shell=True 来执行 .cmd 文件
+        shell = IS_WINDOWS and vscode.endswith('.cmd')
+        # 命令可能是编辑器本体（Code.exe、AppImage 等）而不是会退出的 CLI，不能超时终止
+        return self.launcher.run(cli_open_args(vscode, batch, new_window), shell=shell, detach=True)
+
+    def _do_delete(self, uris):
+        """执行删除操作（记入操作日志，空闲时写入数据库）
+
+        按 URI 删除：确认期间列表可能已被重新加载，索引不再可靠。
+        """
+        uris_to_del = {p['uri'] for p in self.projects} & set(uris)
+        if not uris_to_del:
+            self.message = '待删除的项目已不在列表中'
             return
 
-        # 保存要删除的项目（用于撤销）
-        deleted_projects = [self.projects[i] for i in indices]
-        self.last_deleted = deleted_projects
-
-        # 过滤掉要删除的
-        uris_to_del = {self.projects[i]['uri'] for i in indices}
-        new_projects = [p for p in self.projects if p['uri'] not in uris_to_del]
-
-        # 保存
-        save_projects(self.db_path, new_projects)
+        # 从项目所在的每个来源删除；保存位置和记录（用于撤销），原始条目在写入数据库后补充
+        group = {'count': len(uris_to_del), 'sources': {}}
+        for source in self.sources:
+            removed = [(i, p) for i, p in enumerate(source.projects) if p['uri'] in uris_to_del]
+            if not removed:
+                continue
+            op_id = source.journal.append('remove', uris=sorted(p['uri'] for _, p in removed))
+            group['sources'][source.name] = {'op': op_id, 'records': removed, 'entries': {}}
+            source.projects = [p for p in source.projects if p['uri'] not in uris_to_del]
+        self.undo_stack.append(group)
+        self._schedule_flush()
 
-        # 重新加载
-        self.projects = new_projects
+        self._replace_projects(self.merged())
         self.selected.clear()
-        self.filter()
 
-        self.message = f'🗑️ 已删除 {len(indices)} 个项目，按 u 撤销'
+        self.message = f'🗑️ 已删除 {len(uris_to_del)} 个项目，按 u 撤销'
 
     def undo_delete(self):
-        """撤销删除"""
-        if not self.last_deleted:
+        """撤销删除（可多级）"""
+        if not self.undo_stack:
             self.message = '没有可撤销的删除操作'
             return
 
-        # 恢复删除的项目（插入到开头）
-        restored = self.last_deleted
-        self.projects = restored + self.projects
-        self.last_deleted = []  # 清空撤销记录
-
-        # 保存到数据库
-        self._save_all_projects()
+        group = self.undo_stack.pop()
+        for source in self.sources:
+            info = group['sources'].get(source.name)
+            if not info:
+                continue
+            # 尚未写入数据库的删除直接从日志中取消，否则记录一次恢复操作；
+            # 正在后台写入的等写入完成（得到原始条目）后再处理
+            if info['op'] in source.journal.committing:
+                self.deferred_undo.append((source.name, info))
+            elif not source.journal.cancel(info['op']):
+                items = [[i, info['entries'][p['uri']]] for i, p in info['records']
+                         if p['uri'] in info['entries']]
+                if items:
+                    source.journal.append('restore', items=items)
+                    self._schedule_flush()
+
+            # 按原位置恢复删除的项目
+            projects = list(source.projects)
+            present = {p['uri'] for p in projects}
+            for i, p in info['records']:
+                if p['uri'] not in present:
+                    projects.insert(min(i, len(projects)), p)
+            source.projects = projects
+
+        self._replace_projects(self.merged())
+        self.message = f'✅ 已恢复 {group["count"]} 个项目'
+
+    def _schedule_flush(self):
+        """操作日志在空闲 JOURNAL_IDLE 秒后写入数据库"""
+        self.journal_due = time.monotonic() + JOURNAL_IDLE
+
+    def flush_journal(self):
+        """将各来源的操作日志分别一次性写入数据库（在当前线程中等待完成），返回是否全部成功"""
+        self.finish_flush(wait=True)
+        batches = []
+        for source in self.sources:
+            batch = source.begin_flush()
+            if batch:
+                ops, write = batch
+                batches.append((source, ops, write()))
+        return self._apply_flush(batches)
+
+    def start_flush(self):
+        """在后台线程中写入操作日志，结果由 finish_flush 在 tick 中处理"""
+        if self.writing is not None:
+            self.journal_due = None  # 写入完成后如有新操作再安排
+            return
+        batches = [(source, *batch) for source in self.sources for batch in [source.begin_flush()] if batch]
+        self.journal_due = None
+        if batches:
+            writes = [write for _, _, write in batches]
+            future = self.writer.submit(lambda: [write() for write in writes])
+            self.writing = (future, [(source, ops) for source, ops, _ in batches])
+
+    def finish_flush(self, wait=False):
+        """处理后台写入的结果，返回是否有写入完成（wait 为 True 时等待进行中的写入）"""
+        if self.writing is None:
+            return False
+        future, batches = self.writing
+        if not wait and not future.done():
+            return False
+        self.writing = None
+        try:
+            results = future.result()
+        except Exception as e:
+            results = [{'ok': False, 'error': str(e), 'removed': {}, 'merged': False, 'digest': None}
+                       for _ in batches]
+        self._apply_flush([(source, ops, result) for (source, ops), result in zip(batches, results)])
+        return True
 
-        self.filter()
-        self.cursor = 0
-        self.scroll = 0
-        self.message = f'✅ 已恢复 {len(restored)} 个项目'
+    def _apply_flush(self, batches):
+        """处理写入结果 [(来源, 操作列表, commit_history 的结果)]，返回是否全部成功"""
+        ok = True
+        for source, ops, result in batches:
+            source.end_flush(ops, result)
+            if not result['ok']:
+                self.message = f'❌ 写入数据库失败 ({source.name}): {result["error"]}'
+                ok = False
+            else:
+                if result['merged']:
+                    self.message = f'🔀 {source.name} 的最近打开列表在此期间有变化，已合并写入，按 r 刷新'
+                # 补充已写入的删除操作的原始条目，之后撤销时用于恢复
+                flushed = {op['id'] for op in ops}
+                infos = [group['sources'].get(source.name) for group in self.undo_stack]
+                infos += [info for name, info in self.deferred_undo if name == source.name]
+                for info in infos:
+                    if info and info['op'] in flushed:
+                        for _, p in info['records']:
+                            if p['uri'] in result['removed']:
+                                info['entries'][p['uri']] = result['removed'][p['uri']]
+
+            # 写入期间被撤销的删除：已写入的记录一次恢复，未写入的直接取消
+            for name, info in [d for d in self.deferred_undo if d[0] == source.name]:
+                self.deferred_undo.remove((name, info))
+                if source.journal.cancel(info['op']):
+                    continue
+                items = [[i, info['entries'][p['uri']]] for i, p in info['records']
+                         if p['uri'] in info['entries']]
+                if items:
+                    source.journal.append('restore', items=items)
+                    self._schedule_flush()
+
+        if not ok:
+            self.journal_due = time.monotonic() + JOURNAL_RETRY
+        elif any(source.journal.ops for source in self.sources):
+            self._schedule_flush()
+        else:
+            self.journal_due = None
+        return ok
+
+    def merged(self):
+        """合并各来源的项目列表（按常用程度排序）"""
+        return rank_projects(merge_sources([(s.name, s.projects) for s in self.sources]),
+                             self.frecency)
+
+    def load(self, reprobe=True):
+        """加载项目列表，存在性检测在后台进行
+
+        各来源并行读取；与当前列表按 URI 比较：未变化的记录原样复用，只解析和检测新增或修改的条目；
+        光标和多选按 URI 保持。reprobe 为 True 时重新检测全部项目的存在性。
+        最近打开列表没有变化时返回 False，待提交的操作写入失败时返回 None（错误信息在 message 中）。
+        """
+        # 先写入待提交的操作，避免重新加载后已删除的项目再次出现
+        if not self.flush_journal():
+            return None
 
-    def _save_all_projects(self):
-        """保存所有项目到数据库"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT value FROM ItemTable WHERE key='history.recentlyOpenedPathsList'")
-            row = cursor.fetchone()
-
-            if row:
-                data = json.loads(row[0])
-                # 根据当前 projects 重建 entries
-                keep_uris = {p['uri'] for p in self.projects}
-                original_entries = {}
-                for entry in data.get('entries', []):
-                    uri = entry.get('folderUri') or entry.get('fileUri') or \
-                          (entry.get('workspace', {}) or {}).get('configPath', '')
-                    original_entries[uri] = entry
-
-                # 重建 entries 列表，保持当前顺序
-                new_entries = []
-                for p in self.projects:
-                    if p['uri'] in original_entries:
-                        new_entries.append(original_entries[p['uri']])
-
-                data['entries'] = new_entries
-                cursor.execute("UPDATE ItemTable SET value=? WHERE key='history.recentlyOpenedPathsList'",
-                              (json.dumps(data, ensure_ascii=False),))
-                conn.commit()
-
-            conn.close()
-        except:
-            pass
+        if len(self.sources) > 1:
+            with ThreadPoolExecutor(max_workers=len(self.sources)) as pool:
+                changed = any(list(pool.map(Source.refresh, self.sources)))
+        else:
+            changed = any(source.refresh() for source in self.sources)
+        if changed:
+            self._replace_projects(self.merged())
+
+        if reprobe:
+            self.probing = probe_projects(self.projects, self.prober, self.exists_cache)
+        elif changed:
+            # 只检测新增或修改的记录
+            fresh = [p for p in self.projects if 'exists' not in p]
+            for path, ps in probe_projects(fresh, self.prober, self.exists_cache).items():
+                self.probing.setdefault(path, []).extend(ps)
+        self.index.invalidate_exists()  # 缓存命中的存在状态已直接写入
+        return changed
+
+    def _replace_projects(self, projects):
+        """替换项目列表，光标和多选按 URI 映射到新列表"""
+        cursor_uri = self.projects[self.visible[self.cursor]]['uri'] \
+            if self.visible and self.cursor < len(self.visible) else None
+        selected_uris = {self.projects[i]['uri'] for i in self.selected}
+
+        # 记录有变化（或已删除）的项目需重新渲染
+        old = {p['uri']: p for p in self.projects}
+        for p in projects:
+            if old.pop(p['uri'], None) is not p:
+                self.row_cache.pop(p['uri'], None)
+        for uri in old:
+            self.row_cache.pop(uri, None)
+
+        self.projects = projects
+        self.index.update(projects)
+        pos = {p['uri']: i for i, p in enumerate(projects)}
+        self.selected = {pos[u] for u in selected_uris if u in pos}
+        self.filter(wait=True)  # 旧的结果引用旧列表的索引，不能等待后台搜索
+        if cursor_uri in pos:
+            try:
+                self.cursor = self.visible.index(pos[cursor_uri])
+            except ValueError:
+                pass
+            self.fix_cursor()
+
+    def tick(self):
+        """处理后台任务结果，返回界面是否需要重绘"""
+        changed = apply_probe_results(self.probing, self.prober.poll(), self.exists_cache)
+        if changed:
+            self.index.invalidate_exists()
+            for p in changed:
+                self.row_cache.pop(p['uri'], None)
+        if not self.prober.busy():
+            self.exists_cache.save()
+        if self.journal_due is not None and time.monotonic() >= self.journal_due:
+            self.start_flush()
+        if self.finish_flush():
+            changed = True  # 可能显示错误信息
+        searched = self.searcher.poll()
+        if searched is not None:
+            query, result, _ = searched
+            if query == self.query:
+                self.visible = result
+                self.fix_cursor()
+                changed = True
+        launched = self.launcher.poll()
+        if launched:
+            self.report_launches(launched)
+            changed = True
+        watched = [s.watcher.poll() for s in self.sources if s.watcher]
+        if any(watched):
+            self.reload_due = True
+        if self.reload_due:
+            # 有待写入的操作时先在后台写入，写完再重新加载，不在界面线程中等待数据库
+            if self.writing is None and any(source.journal.ops for source in self.sources):
+                if self.journal_due is None:
+                    self.journal_due = time.monotonic()  # 立即写入（失败时按 JOURNAL_RETRY 重试）
+            elif self.writing is None:
+                self.reload_due = False
+                if self.load(reprobe=False):
+                    # 其他窗口修改了最近打开列表
+                    self.message = '🔄 项目列表已更新'
+                    changed = True
+        return changed
+
+    def report_launches(self, launched):
+        """在状态栏显示启动结果"""
+        failed = [(names, error) for names, error in launched if error]
+        if failed:
+            names, error = failed[0]
+            more = f' 等 {len(failed)} 批' if len(failed) > 1 else ''
+            self.message = f'❌ 启动失败: {", ".join(names[:3])}{more} ({error})'
+            return
+        names = [name for batch, _ in launched for name in batch]
+        more = f' ... 等 {len(names)} 项' if len(names) > 3 else ''
+        self.message = f'✅ 已打开: {", ".join(names[:3])}{more}'
+
+    def wait_timeout(self):
+        """下次需要处理后台任务的等待时间（秒），None 表示一直等待按键"""
+        timeouts = []
+        if self.prober.busy() or self.launcher.busy() or self.writing is not None:
+            timeouts.append(POLL_INTERVAL)
+        if self.searcher.busy():
+            timeouts.append(SEARCH_POLL)
+        for source in self.sources:
+            if source.watcher:
+                timeouts.append(source.watcher.timeout())
+        if self.journal_due is not None:
+            timeouts.append(max(0, self.journal_due - time.monotonic()))
+        timeouts = [t for t in timeouts if t is not None]
+        return min(timeouts) if timeouts else None
 
     def handle_key(self, key):
         """处理按键"""
         if key is None:
             return
 
+        # 窗口大小改变（不清除消息）
+        if key == 'RESIZE':
+            self.relayout()
+            return
+
         self.message = ''  # 清除消息
 
         # ─────────────────────────────────────────────────
@@ -1367,6 +3729,7 @@ class App:
             elif key == 'BACKSPACE':
                 if self.query:
                     self.query = self.query[:-1]
+                    self.cursor = 0
                     self.filter()
                 else:
                     self.search_mode = False
@@ -1376,6 +3739,7 @@ class App:
                 self.filter()
             elif isinstance(key, str) and len(key) == 1 and key.isprintable():
                 self.query += key
+                self.cursor = 0  # 结果按得分排序，光标回到最佳匹配
                 self.filter()
             return
 
@@ -1522,13 +3886,11 @@ class App:
             if not self.visible:
                 return
             # 进入删除确认模式
-            if self.selected:
-                self.pending_delete = list(self.selected)
-            else:
-                self.pending_delete = [self.visible[self.cursor]]
+            indices = sorted(self.selected) if self.selected else [self.visible[self.cursor]]
+            self.pending_delete = [self.projects[i]['uri'] for i in indices]
             self.confirm_delete = True
-            count = len(self.pending_delete)
-            names = ', '.join(self.projects[i]['name'] for i in self.pending_delete[:3])
+            count = len(indices)
+            names = ', '.join(self.projects[i]['name'] for i in indices[:3])
             if count > 3:
                 names += f' ... 等 {count} 项'
             self.message = f'❗ 确认删除 {names}？ (y)确认 (n/Esc)取消'
@@ -1536,10 +3898,12 @@ class App:
 
         # 刷新
         if key in ('r', 'R'):
-            self.projects = load_projects(self.db_path)
-            self.selected.clear()
-            self.last_deleted = []  # 刷新后清除撤销记录
-            self.filter()
+            changed = self.load()
+            if changed is None:
+                return  # 保留写入失败的提示
+            if not changed:
+                self.message = '✨ 项目列表无变化'
+                return
             self.message = '✨ 已刷新项目列表'
             return
 
@@ -1562,10 +3926,10 @@ class App:
                 p = self.projects[idx]
                 # 优先打开目录，如果是文件则打开所在目录
                 path = p['full_path'] if p['type'] == 'folder' else p['path']
-                if open_in_file_manager(path):
-                    self.message = f'📂 已在资源管理器中打开: {p["name"]}'
-                else:
-                    self.message = f'❌ 无法打开资源管理器'
+                args, shell, check = file_manager_command(path)
+                self.launcher.submit_command([p['name']], args, shell=shell, check=check,
+                                             detach=True)
+                self.message = f'📂 已在资源管理器中打开: {p["name"]}'
             return
 
         # 撤销删除
@@ -1590,17 +3954,28 @@ class App:
             print(f'{C.GRAY}例如: vscode-projects --code "C:\\path\\to\\code.cmd"{C.RST}')
             return 1
 
-        self.db_path = get_db_path(CUSTOM_DB_PATH)
-        if not self.db_path or not os.path.exists(self.db_path):
+        db_paths = get_db_paths(CUSTOM_DB_PATH)
+        found = [(name, path) for name, path in db_paths if path and os.path.exists(path)]
+        if not found:
             print(f'{C.RED}错误: 未找到 VSCode 数据库{C.RST}')
-            print(f'{C.GRAY}路径: {self.db_path}{C.RST}')
+            print(f'{C.GRAY}路径: {db_paths[0][1]}{C.RST}')
             if not CUSTOM_DB_PATH:
                 print(f'{C.GRAY}提示: 使用 --db 参数指定数据库路径{C.RST}')
                 print(f'{C.GRAY}例如: vscode-projects --db "path/to/state.vscdb"{C.RST}')
             return 1
 
+        self.sources = [Source(name, path) for name, path in found]
+        for source in self.sources:
+            source.vscode = get_vscode_cmd(CUSTOM_CODE_PATH, source.name) or self.vscode
+
+        # 补写上次未提交的操作
+        if not self.flush_journal():
+            print(f'{C.RED}{self.message}{C.RST}')
+            return 1
+
         # 加载
-        self.projects = load_projects(self.db_path)
+        self.frecency = self.usage.scores()
+        self.load()
 
         if not self.projects:
             print(f'{C.YELLOW}没有最近打开的项目{C.RST}')
@@ -1608,16 +3983,47 @@ class App:
 
         self.filter()
 
+        wake_fds = []
+        if WATCH_MODE:
+            for source in self.sources:
+                source.watcher = DbWatcher(source.db_path)
+                if source.watcher.fileno() is not None:
+                    wake_fds.append(source.watcher.fileno())
+
         # 启动终端
         self.term.start()
+        self.relayout()
 
         try:
+            dirty = True
             while self.running:
-                self.draw()
-                key = self.term.read_key()
-                self.handle_key(key)
+                if dirty:
+                    self.draw()
+                # 有后台任务时定时唤醒以回填结果
+                key = self.term.read_key(self.wait_timeout(), wake_fds)
+                dirty = key is not None
+                if dirty:
+                    self.handle_key(key)
+                    if self.journal_due is not None:
+                        self._schedule_flush()  # 有操作时推迟写入
+                if self.tick():
+                    dirty = True
         finally:
             self.term.stop()
+            # 等待启动完成（退出前启动线程会被终止）
+            for names, error in self.launcher.wait(LAUNCH_TIMEOUT):
+                if error:
+                    print(f'{C.RED}❌ 启动失败: {", ".join(names)} ({error}){C.RST}')
+            if not self.flush_journal():
+                print(f'{C.RED}{self.message}{C.RST}')
+                print(f'{C.GRAY}未写入的操作已保存，下次启动时会自动补写{C.RST}')
+            for source in self.sources:
+                source.close()
+            self.usage.close()
+            self.writer.shutdown()
+            self.index.close()
+            if shard_pool.cache_info().currsize:
+                shard_pool().shutdown(wait=False, cancel_futures=True)
 
         return 0
 
@@ -1639,13 +4045,17 @@ def show_help():
   -l, --list          列出项目
   -v, --version       版本信息
   -c, --code <path>   指定 VSCode 可执行文件路径
-  -d, --db <path>     指定 state.vscdb 数据库路径
+  -d, --db <path>     指定 state.vscdb 数据库路径 (默认读取所有已安装编辑器)
+  -t, --ttl <前缀=秒>  路径存在性缓存有效期，可多次指定 (如 /mnt/=600)
+  -w, --watch         监视数据库变化，其他窗口打开的项目自动出现在列表中
 
 {C.BOLD}示例:{C.RST}
   vscode-projects                            # 交互模式
   vscode-projects -l                         # 列出所有项目
   vscode-projects --code "C:\\path\\code.cmd"  # 指定 VSCode 路径
   vscode-projects --db "path/to/state.vscdb"  # 指定数据库路径
+  vscode-projects --ttl /mnt/=600 --ttl =5   # 调整存在性缓存有效期
+  vscode-projects --watch                    # 自动刷新模式
 
 {C.BOLD}快捷键 - 导航:{C.RST}
   {C.YELLOW}↑/↓ j/k{C.RST}    上下移动
@@ -1671,18 +4081,33 @@ def show_help():
   {C.YELLOW}/{C.RST}          进入搜索模式
   {C.YELLOW}Esc{C.RST}        清除搜索 → 取消选择 → 退出
   {C.YELLOW}d{C.RST}          删除记录
-  {C.YELLOW}u{C.RST}          撤销删除（未被其他操作覆盖时可用）
+  {C.YELLOW}u{C.RST}          撤销删除（可多次撤销）
   {C.YELLOW}r{C.RST}          刷新列表
   {C.YELLOW}q{C.RST}          退出
+
+{C.BOLD}搜索语法:{C.RST} (空格分隔，同时满足)
+  {C.YELLOW}文本{C.RST}             模糊匹配名称、标签和路径
+  {C.YELLOW}'文本{C.RST}            精确匹配（作为子串出现）
+  {C.YELLOW}tag:ssh{C.RST}          标签包含 ssh
+  {C.YELLOW}type:folder{C.RST}      类型 folder/file/workspace
+  {C.YELLOW}exists:no{C.RST}        存在状态 yes/no/unknown
+  {C.YELLOW}host:box{C.RST}         远程主机名包含 box
+  {C.YELLOW}under:d:/src{C.RST}     路径位于该目录下
+  {C.YELLOW}/正则/{C.RST}           正则匹配名称或路径
+  {C.YELLOW}-条件{C.RST}            取反，如 -tag:wsl
 ''')
 
 
 def list_projects():
-    db_path = get_db_path(CUSTOM_DB_PATH)
-    projects = load_projects(db_path)
+    db_paths = [(name, path) for name, path in get_db_paths(CUSTOM_DB_PATH)
+                if path and os.path.exists(path)]
+    projects = rank_projects(load_sources(db_paths), UsageStore().scores())
+    primary = db_paths[0][0] if db_paths else None
     for p in projects:
-        tag = f" [{p['tag']}]" if p['tag'] else ''
-        invalid = '' if p.get('exists', True) else f' {C.DIM}[无效]{C.RST}'
+        tag = project_tag(p, primary)
+        tag = f' [{tag}]' if tag else ''
+        exists = p.get('exists', True)
+        invalid = '' if exists else f' {C.DIM}[无效]{C.RST}' if exists is False else f' {C.DIM}[未知]{C.RST}'
         icon = '📁' if p['type'] == 'folder' else '📄' if p['type'] == 'file' else '📦'
         print(f"{icon} {C.WHITE}{p['name']}{C.RST}{C.CYAN}{tag}{C.RST}{invalid}")
         # 显示路径，有转换路径时显示转换后的
@@ -1693,9 +4118,10 @@ def list_projects():
 # 全局变量：用户指定的路径
 CUSTOM_CODE_PATH = None
 CUSTOM_DB_PATH = None
+WATCH_MODE = False  # 监视数据库变化自动刷新
 
 def main():
-    global CUSTOM_CODE_PATH, CUSTOM_DB_PATH
+    global CUSTOM_CODE_PATH, CUSTOM_DB_PATH, WATCH_MODE
 
     i = 1
     while i < len(sys.argv):
@@ -1723,10 +4149,25 @@ def main():
             else:
                 print(f'{C.RED}错误: --db 需要指定路径{C.RST}')
                 return 1
+        elif arg in ('-w', '--watch'):
+            WATCH_MODE = True
+        elif arg in ('-t', '--ttl'):
+            # 前缀=秒，如 /mnt/=600
+            value = sys.argv[i + 1] if i + 1 < len(sys.argv) else ''
+            prefix, sep, seconds = value.rpartition('=')
+            try:
+                if not sep:
+                    raise ValueError
+                EXISTS_TTL[prefix] = float(seconds)
+            except ValueError:
+                print(f'{C.RED}错误: --ttl 格式为 <路径前缀>=<秒>{C.RST}')
+                return 1
+            i += 1
         i += 1
 
     return App().run()
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     sys.exit(main())